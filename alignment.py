@@ -0,0 +1,498 @@
+from array import array
+from bisect import bisect_left, bisect_right
+
+from highlighting import CORRECT, INCORRECT, UNTYPED
+from passage import passage_info
+
+# Columns between stored checkpoints; how many columns a paste is aligned
+# at a time and how far from where the typist is expected the position is
+# searched; and how many passage rows each column keeps
+CHECKPOINT_EVERY = 64
+TRACE_COLUMNS = 32
+BAND_ROWS = 128
+
+# Distance of a cell outside a column's band
+OUTSIDE = 1 << 62
+
+
+class Aligner:
+    # Incremental alignment of the typed text against the passage.
+    #
+    # Uses the bit-parallel edit distance of Myers, in Hyyro's formulation
+    # for global distances: the passage is the bit-vector axis (one bit per
+    # passage character, in Python ints) and every typed character advances
+    # one column. Column j holds the vertical deltas (Pv/Mv) of
+    # D[i][j] = edit distance between passage[:i] and typed[:j], so
+    #
+    #     D[i][j] = D[base][j] + popcount(Pv & mask(i - base))
+    #                          - popcount(Mv & mask(i - base))
+    #
+    # Only a band of BAND_ROWS rows from `base` is kept per column, centred
+    # on where the typist is expected to be, so a keystroke costs the same
+    # however long the passage is. Cells outside the band count as
+    # unreachable; the band is exact while the alignment stays inside it,
+    # and for passages of up to BAND_ROWS characters it is the whole column.
+    #
+    # The typist's position is the row with the smallest distance near the
+    # previous one, and that distance is the error count. A skipped or extra
+    # character therefore costs one error instead of shifting everything
+    # after it.
+    #
+    # Column states are kept for the last CHECKPOINT_EVERY + TRACE_COLUMNS
+    # columns plus a checkpoint every CHECKPOINT_EVERY columns, so backspace
+    # or a mid-text edit rewinds by recomputing at most a few dozen columns.
+    #
+    # The alignment path is kept as the rows it covers in each column. Each
+    # step of it marks a passage character correct or incorrect, and those
+    # marks are counted per character, so a character's status is exactly
+    # what the whole path says about it. After each update the path is
+    # traced back from the new position until it joins the old one in a
+    # column the update left alone; the marks of the old path after that
+    # point are taken back and those of the new one added.
+
+    def __init__(self, text=""):
+        self.load(text)
+
+    def load(self, text):
+        # The position masks and word spans come from the cached passage
+        # metadata and are only read here
+        info = passage_info(text)
+        self.text = text
+        self.m = len(text)
+        self._peq = info.masks
+        self._width = min(BAND_ROWS, self.m)
+        self._band_mask = (1 << self._width) - 1
+        self._mask_bytes = self._width // 8 + 2  # Bytes covering a band at any offset
+
+        # (base, D[base][j], Pv, Mv); D[i][0] = i: every vertical delta is +1
+        initial = (0, 0, self._band_mask, 0)
+        self._checkpoints = [initial]
+        self._recent = [initial]
+        self._recent_base = 0
+        self._bases = array('I', [0])  # Band start of every column
+
+        self.typed = ""
+        self.row = 0
+        self.distance = 0
+        self.status = bytearray(self.m)
+        self.changed = (0, 0)
+
+        # The path: the rows it covers in each column, and the character the
+        # step into each column marks (-1 for none) and whether as correct
+        self._path_low = array('I', [0])
+        self._path_high = array('I', [0])
+        self._entry = array('i', [-1])
+        self._entry_correct = bytearray(1)
+        self._traced_row = 0
+        # Marks per passage character from the whole path
+        self._correct_marks = array('I', [0]) * self.m
+        self._incorrect_marks = array('I', [0]) * self.m
+
+        # Word spans of the passage, for counting correct words
+        self._word_starts = info.word_starts
+        self._word_ends = info.word_ends
+        self._word_ok = bytearray(len(self._word_starts))
+        self.correct_words = 0
+        # Index of the word the typist is in or about to start
+        self.current_word = 0
+
+    @property
+    def passage_words(self):
+        return len(self._word_starts)
+
+    def word_span(self, word=None):
+        # (start, end) of a word, by default the current one; (0, 0) past
+        # the last word
+        if word is None:
+            word = self.current_word
+        if word >= len(self._word_starts):
+            return (0, 0)
+        return (self._word_starts[word], self._word_ends[word])
+
+    def update(self, typed):
+        # Returns the (start, end) range of passage positions whose status
+        # changed, also kept in self.changed
+        old = self.typed
+        if typed == old:
+            self.changed = (0, 0)
+            return self.changed
+
+        if typed.startswith(old):
+            common = len(old)
+        elif old.startswith(typed):
+            common = len(typed)
+        else:
+            # Longest shared prefix, halving the range still unknown; each
+            # comparison only covers that range, so the scan stays in C
+            common, limit = 0, min(len(old), len(typed))
+            while common < limit:
+                middle = (common + limit + 1) // 2
+                if typed.startswith(old[common:middle], common):
+                    common = middle
+                else:
+                    limit = middle - 1
+
+        self._rewind(common, old)
+        self.typed = typed
+        low, high = self.m, 0
+        if common < len(old):
+            self._find_row(common, self.row - (len(old) - common))
+            if common == len(typed):
+                low, high = self._merge(low, high, self._retrace(common, common))
+
+        # Long insertions (pastes) are aligned a trace window at a time, so
+        # each trace only goes back over the window it added
+        column = common
+        while column < len(typed):
+            end = min(len(typed), column + TRACE_COLUMNS)
+            previous_row = self.row
+            previous_distance = self.distance
+            for offset, char in enumerate(typed[column:end], 1):
+                self._push(char, previous_row + offset)
+            self._find_row(end, previous_row + end - column)
+            if (end == column + 1 and self.row == previous_row + 1
+                    and self.distance == previous_distance
+                    and self.text[previous_row] == typed[column]
+                    and self._path_ends_at(column, previous_row)):
+                # One more matching character on the diagonal: the trace
+                # would step straight back onto the previous path
+                changed = self._extend_path(previous_row)
+            else:
+                changed = self._retrace(column, end)
+            low, high = self._merge(low, high, changed)
+            column = end
+
+        self.changed = (low, high) if low < high else (0, 0)
+        if low < high:
+            self._recount_words(low, high)
+        self._track_word()
+        return self.changed
+
+    def _track_word(self):
+        # The current word is the first one ending at or after the typist's
+        # position. Typing moves it at most one word, which is checked
+        # directly; anything else (a paste, deleting a selection) bisects.
+        ends = self._word_ends
+        row = self.row
+        word = self.current_word
+        count = len(ends)
+        if word < count and ends[word] >= row and (word == 0 or ends[word - 1] < row):
+            return
+        if word + 1 < count and ends[word] < row <= ends[word + 1]:
+            self.current_word = word + 1
+        else:
+            self.current_word = bisect_left(ends, row)
+
+    @staticmethod
+    def _merge(low, high, changed):
+        if changed[0] < changed[1]:
+            return min(low, changed[0]), max(high, changed[1])
+        return low, high
+
+    def column_distance(self, row, column_state=None):
+        # D[row] in a column, by default the latest; OUTSIDE past its band
+        base, top, pv, mv = column_state if column_state is not None else self._recent[-1]
+        if row < base or row > base + self._width:
+            return OUTSIDE
+        mask = (1 << (row - base)) - 1
+        return top + (pv & mask).bit_count() - (mv & mask).bit_count()
+
+    def _eq(self, char, base):
+        # Bit k set where passage[base + k] is char, read from the band's
+        # bytes only rather than shifting a passage-long int
+        bits = self._peq.get(char)
+        if bits is None:
+            return 0
+        start = base >> 3
+        window = int.from_bytes(bits[start:start + self._mask_bytes], "little")
+        return (window >> (base & 7)) & self._band_mask
+
+    def _step(self, state, char, base):
+        old_base, top, pv, mv = state
+        mask = self._band_mask
+        eq = self._eq(char, old_base)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | (~(xh | pv) & mask)
+        mh = pv & xh
+        # The band's top row grows by one every column (rows above it are
+        # unreachable, or there are none)
+        ph = ((ph << 1) | 1) & mask
+        mh = (mh << 1) & mask
+        pv, mv = mh | (~(xv | ph) & mask), ph & xv
+        top += 1
+        # Move the band. Rows it gains are only reached through its edge
+        # row, one skipped character per row.
+        shift = base - old_base
+        if shift > 0:
+            low = (1 << shift) - 1
+            top += (pv & low).bit_count() - (mv & low).bit_count()
+            pv = (pv >> shift) | (mask ^ (mask >> shift))
+            mv >>= shift
+        elif shift < 0:
+            shift = -shift
+            top += shift
+            pv = (pv << shift) & mask
+            mv = ((mv << shift) | ((1 << shift) - 1)) & mask
+        return (base, top, pv, mv)
+
+    def _band_base(self, expected):
+        # Band start for a column whose alignment should end near `expected`
+        return min(max(0, expected - self._width // 2), self.m - self._width)
+
+    def _push(self, char, expected):
+        base = self._band_base(expected)
+        state = self._step(self._recent[-1], char, base)
+        self._recent.append(state)
+        self._bases.append(base)
+        column = self._recent_base + len(self._recent) - 1
+        if column % CHECKPOINT_EVERY == 0:
+            self._checkpoints.append(state)
+        if len(self._recent) > 2 * CHECKPOINT_EVERY + TRACE_COLUMNS:
+            drop = CHECKPOINT_EVERY
+            del self._recent[:drop]
+            self._recent_base += drop
+
+    def _rewind(self, column, old):
+        # Make the state of `column` (typed[:column], shared with `old`) the
+        # latest one, keeping TRACE_COLUMNS of history where possible
+        if column >= len(old):
+            return
+        if column - TRACE_COLUMNS >= self._recent_base or self._recent_base == 0:
+            del self._recent[column - self._recent_base + 1:]
+        else:
+            start = max(0, column - TRACE_COLUMNS) // CHECKPOINT_EVERY * CHECKPOINT_EVERY
+            self._recent = [self._checkpoints[start // CHECKPOINT_EVERY]]
+            self._recent_base = start
+            for c in range(start + 1, column + 1):
+                self._recent.append(self._step(self._recent[-1], old[c - 1], self._bases[c]))
+        del self._checkpoints[column // CHECKPOINT_EVERY + 1:]
+        del self._bases[column + 1:]
+
+    def _extend_recent(self):
+        # Recompute the CHECKPOINT_EVERY columns before the recent states
+        # from the checkpoint they start at
+        start = self._recent_base - CHECKPOINT_EVERY
+        states = [self._checkpoints[start // CHECKPOINT_EVERY]]
+        for c in range(start + 1, self._recent_base):
+            states.append(self._step(states[-1], self.typed[c - 1], self._bases[c]))
+        self._recent[:0] = states
+        self._recent_base = start
+
+    def _find_row(self, column, expected):
+        # Smallest distance in a band of rows around where the typist is
+        # expected to be; ties go to the furthest row
+        state = self._recent[-1]
+        base, _, pv, mv = state
+        last = base + self._width
+        low = min(max(base, expected - TRACE_COLUMNS), last)
+        high = max(min(last, expected + TRACE_COLUMNS), low)
+        best_row = low
+        best = distance = self.column_distance(low, state)
+        pv_bits = pv >> (low - base)
+        mv_bits = mv >> (low - base)
+        for row in range(low + 1, high + 1):
+            distance += (pv_bits & 1) - (mv_bits & 1)
+            pv_bits >>= 1
+            mv_bits >>= 1
+            if distance <= best:
+                best = distance
+                best_row = row
+        # Rows outside the search can only beat it when the typed text is
+        # far off the passage (e.g. a paste); check the straight diagonal
+        if best_row != column:
+            diagonal = self.column_distance(column, state)
+            if diagonal < best:
+                best, best_row = diagonal, column
+        self.row = best_row
+        self.distance = best
+
+    def _retrace(self, common, end):
+        # Trace the path back from (row, end) until it joins the old
+        # path in a column up to `common`, whose cells the update did not
+        # change, and swap the marks of the old path after that column for
+        # the new one's. Returns the range of positions whose status changed.
+        text = self.text
+        typed = self.typed
+        row = self.row
+        old_row = self._traced_row
+        path_low = self._path_low
+        path_high = self._path_high
+        # Extra characters at the typist's row are marked by where that row
+        # is, so a join on it only counts if the row has not moved
+        join_below = min(row, old_row) if row != old_row else row + 1
+
+        # D[i][c] along the path only, each from one masked popcount
+        distance = self.column_distance
+        recent = self._recent
+        state = recent[end - self._recent_base]
+        d = distance(row, state)
+
+        # Rows covered in each new column, from the last column back
+        lows = []
+        highs = []
+        i, c = row, end
+        high = i
+        while True:
+            if c <= common and path_low[c] <= i <= path_high[c] and i < join_below:
+                first, first_low = c, path_low[c]
+                break
+            if c == 0:
+                # Every passage character above was skipped
+                first, first_low = 0, 0
+                break
+            if c - 1 < self._recent_base:
+                self._extend_recent()
+                recent = self._recent
+            left_state = recent[c - 1 - self._recent_base]
+            if i == 0:
+                diagonal = False  # Only extra characters left
+                previous = distance(0, left_state)
+            elif d >= OUTSIDE:
+                diagonal = True  # Lost the band; head back along the diagonal
+                previous = distance(i - 1, left_state)
+            else:
+                previous = distance(i - 1, left_state)
+                if (text[i - 1] == typed[c - 1] and previous == d) or previous == d - 1:
+                    diagonal = True
+                else:
+                    above = distance(i - 1, state)
+                    previous = distance(i, left_state)
+                    if above == d - 1 or previous >= OUTSIDE:
+                        i -= 1  # Skipped
+                        d = above
+                        continue
+                    diagonal = False  # Extra character typed
+            lows.append(i)
+            highs.append(high)
+            if diagonal:
+                i -= 1
+            c -= 1
+            state = left_state
+            d = previous
+            high = i
+
+        # Take back the old path's marks from `first` on, then add the new
+        # path's. Marks of both lie between the row before the join and the
+        # further of the two ends.
+        entry = self._entry
+        entry_correct = self._entry_correct
+        correct_marks = self._correct_marks
+        incorrect_marks = self._incorrect_marks
+        for column in range(first, len(path_low)):
+            position = entry[column]
+            if position >= 0:
+                if entry_correct[column]:
+                    correct_marks[position] -= 1
+                else:
+                    incorrect_marks[position] -= 1
+            for skipped in range(path_low[column], path_high[column]):
+                incorrect_marks[skipped] -= 1
+        del path_low[first:]
+        del path_high[first:]
+        del entry[first:]
+        del entry_correct[first:]
+        lows.append(first_low)
+        highs.append(high)
+        for column in range(first, end + 1):
+            low = lows.pop()
+            high = highs.pop()
+            if column == 0:
+                position, correct = -1, False
+            elif low == path_high[column - 1] + 1:
+                position = low - 1
+                correct = text[position] == typed[column - 1]
+            else:
+                # Extra character: mark the passage character it follows
+                # (or, at the start of a word, the one it precedes) so the
+                # word fails and the typo shows
+                position = self._insertion_mark(low)
+                position, correct = (-1 if position is None else position), False
+            path_low.append(low)
+            path_high.append(high)
+            entry.append(position)
+            entry_correct.append(correct)
+            if position >= 0:
+                if correct:
+                    correct_marks[position] += 1
+                else:
+                    incorrect_marks[position] += 1
+            for skipped in range(low, high):
+                incorrect_marks[skipped] += 1
+        self._traced_row = row
+
+        # A mark of an incorrect step wins over a correct one
+        status = self.status
+        changed_low = self.m
+        changed_high = 0
+        for position in range(max(0, first_low - 1), max(row, old_row)):
+            if incorrect_marks[position]:
+                value = INCORRECT
+            elif correct_marks[position]:
+                value = CORRECT
+            else:
+                value = UNTYPED
+            if status[position] != value:
+                status[position] = value
+                if changed_low > position:
+                    changed_low = position
+                changed_high = position + 1
+        if changed_low >= changed_high:
+            return (0, 0)
+        return (changed_low, changed_high)
+
+    def _path_ends_at(self, column, row):
+        # Whether the traced path ends at (row, column) having reached that
+        # row through a passage character. Extra characters typed at the
+        # last row are marked by where that row is, so if it moves they
+        # need a trace.
+        path_low = self._path_low
+        if len(path_low) != column + 1 or self._traced_row != row:
+            return False
+        return column == 0 or path_low[column] != row or self._path_high[column - 1] != row
+
+    def _extend_path(self, position):
+        # Add a correct diagonal step through passage[position]
+        self._path_low.append(position + 1)
+        self._path_high.append(position + 1)
+        self._entry.append(position)
+        self._entry_correct.append(True)
+        self._correct_marks[position] += 1
+        self._traced_row = position + 1
+        if self.status[position] == CORRECT:
+            return (0, 0)
+        self.status[position] = CORRECT
+        return (position, position + 1)
+
+    def _insertion_mark(self, gap):
+        # Passage position to mark for a character typed between passage
+        # positions gap - 1 and gap; kept inside the word the gap is in
+        word = bisect_left(self._word_ends, gap)
+        position = gap - 1
+        if word < len(self._word_starts) and self._word_starts[word] <= gap:
+            position = max(self._word_starts[word], gap - 1)
+            if position >= self.row:
+                position = gap - 1
+        elif position < 0:
+            position = 0
+        if position >= self.row or position < 0:
+            return None
+        return position
+
+    def _recount_words(self, start, end):
+        # A word counts when all its characters are correct and neither
+        # separator next to it was skipped or mistyped ("thecat" is two
+        # wrong words). Words touching start..end, separators included.
+        first = bisect_left(self._word_ends, start)
+        last = bisect_right(self._word_starts, end)
+        status = self.status
+        m = self.m
+        for word in range(first, last):
+            word_start = self._word_starts[word]
+            word_end = self._word_ends[word]
+            ok = (all(status[p] == CORRECT for p in range(word_start, word_end))
+                  and (word_start == 0 or status[word_start - 1] != INCORRECT)
+                  and (word_end == m or status[word_end] != INCORRECT))
+            if ok != self._word_ok[word]:
+                self._word_ok[word] = ok
+                self.correct_words += 1 if ok else -1
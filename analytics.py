@@ -0,0 +1,105 @@
+import tkinter as tk
+
+# Per-key and per-bigram error and latency counters.
+#
+# A round's counters are built up keystroke by keystroke in the session and
+# merged into the key_stats table (one row per user, kind and key) when the
+# round is saved, so the heatmap reads a few hundred aggregate rows however
+# many rounds a user has played.
+
+KEY = "key"
+BIGRAM = "bigram"
+
+# Gaps longer than this are pauses, not typing latency
+MAX_LATENCY = 2.0
+
+KEYBOARD_ROWS = ["1234567890-=", "qwertyuiop[]", "asdfghjkl;'", "zxcvbnm,./"]
+
+
+class KeyStats:
+    # {(kind, sequence): [attempts, errors, latency_ms, timed]} for one
+    # round. Attempts are keyed by the passage character the typist had to
+    # type; bigrams by it and the passage character before it.
+
+    __slots__ = ("counters",)
+
+    def __init__(self):
+        self.counters = {}
+
+    def __len__(self):
+        return len(self.counters)
+
+    def record(self, expected, typed, latency=None, previous=None):
+        error = typed != expected
+        self._add(KEY, expected, error, latency)
+        if previous is not None and not previous.isspace() and not expected.isspace():
+            self._add(BIGRAM, previous + expected, error, latency)
+
+    def _add(self, kind, sequence, error, latency):
+        counter = self.counters.get((kind, sequence))
+        if counter is None:
+            counter = self.counters[(kind, sequence)] = [0, 0, 0.0, 0]
+        counter[0] += 1
+        if error:
+            counter[1] += 1
+        if latency is not None and latency <= MAX_LATENCY:
+            counter[2] += latency * 1000
+            counter[3] += 1
+
+    def rows(self, user_id):
+        # Parameter tuples for storage.upsert_key_stats
+        for (kind, sequence), (attempts, errors, latency_ms, timed) in self.counters.items():
+            yield (user_id, kind, sequence, attempts, errors, latency_ms, timed)
+
+
+def error_color(error_rate, worst=0.2):
+    # Green at no errors through to red at `worst` and above
+    amount = min(error_rate / worst, 1.0)
+    low = (0x2E, 0xCC, 0x71)
+    high = (0xE7, 0x4C, 0x3C)
+    return "#" + "".join(f"{int(a + (b - a) * amount):02X}" for a, b in zip(low, high))
+
+
+class KeyHeatmap(tk.Canvas):
+    # Keyboard drawn on a canvas, each key coloured by its error rate and
+    # labelled with its mean latency. Fed the (sequence, attempts, errors,
+    # latency_ms, timed) rows of storage.key_stats.
+
+    KEY_SIZE = 44
+    GAP = 4
+
+    def __init__(self, parent, rows, **kwargs):
+        width = len(KEYBOARD_ROWS[0]) * (self.KEY_SIZE + self.GAP) + self.KEY_SIZE
+        height = (len(KEYBOARD_ROWS) + 1) * (self.KEY_SIZE + self.GAP)
+        super().__init__(parent, width=width, height=height, bg="#34495E", highlightthickness=0, **kwargs)
+        self.stats = {}
+        for sequence, attempts, errors, latency_ms, timed in rows:
+            key = sequence.lower()
+            total = self.stats.setdefault(key, [0, 0, 0.0, 0])
+            total[0] += attempts
+            total[1] += errors
+            total[2] += latency_ms
+            total[3] += timed
+        self.draw()
+
+    def draw(self):
+        size = self.KEY_SIZE
+        step = size + self.GAP
+        for row, keys in enumerate(KEYBOARD_ROWS):
+            offset = row * size // 3
+            for column, key in enumerate(keys):
+                x = offset + column * step
+                self._draw_key(key, key.upper(), x, row * step, x + size, row * step + size)
+        # Space bar under the bottom row
+        y = len(KEYBOARD_ROWS) * step
+        self._draw_key(" ", "space", 3 * step, y, 9 * step - self.GAP, y + size)
+
+    def _draw_key(self, key, label, x0, y0, x1, y1):
+        attempts, errors, latency_ms, timed = self.stats.get(key, (0, 0, 0.0, 0))
+        fill = error_color(errors / attempts) if attempts else "#2C3E50"
+        self.create_rectangle(x0, y0, x1, y1, fill=fill, outline="#2C3E50")
+        self.create_text((x0 + x1) // 2, y0 + 14, text=label, fill="#ECF0F1", font=("Helvetica", 11, "bold"))
+        if timed:
+            self.create_text(
+                (x0 + x1) // 2, y1 - 11, text=f"{latency_ms / timed:.0f}ms", fill="#ECF0F1", font=("Helvetica", 8)
+            )
@@ -1,18 +1,56 @@
+import startup  # First, so --startup-timing can time the imports below
 import tkinter as tk
 import time
-import sqlite3
 #import os
 #os.environ['path'] += r';C:\path\cairo\dlls'
+import os
 import sys
-from PIL import Image, ImageTk
-import cairosvg
-import io
-import threading
-import pygame
 import tkinter.messagebox as messagebox
 from tkinter import ttk
+from highlighting import PromptHighlighter
+from scoring import ScoreSummary
+from session import TypingSession
+from analytics import KeyHeatmap
+from history import HistoryBrowser, when_fetched
+from storage import ResultStore
+from timer import CountdownTimer, format_time
+from assets import AssetCache
+from corpus import Corpus, DEFAULT_CORPUS
+from modes import MODES, mode_from_argv
+from passage import passage_info
+import instrumentation
+import sound
 
-def load_texts_from_files():
+def open_sampler(seed=None, corpus_path=DEFAULT_CORPUS):
+    # Passage sampler over the installed corpus, or None. The app keeps one
+    # for the whole session so no passage repeats across rounds or endless
+    # batches; the corpus stays mapped while it is in use.
+    if os.path.exists(corpus_path):
+        try:
+            return Corpus(corpus_path).sampler(seed)
+        except (OSError, ValueError) as e:
+            print(f"Error loading corpus: {e}")
+    return None
+
+def load_texts_from_files(count=3, seed=None, corpus_path=DEFAULT_CORPUS, sampler=None):
+    # Sample the rounds from the passage corpus when one is installed;
+    # only the chosen passages are read from it. Without a sampler, a
+    # one-off one is opened and closed again.
+    owned = sampler is None
+    if owned:
+        sampler = open_sampler(seed, corpus_path)
+    if sampler is not None:
+        corpus = sampler.selection.corpus
+        try:
+            texts = [corpus.passage(n) for n in sampler.take(count)]
+            if texts:
+                return texts
+        except (OSError, ValueError) as e:
+            print(f"Error loading corpus: {e}")
+        finally:
+            if owned:
+                corpus.close()
+    
     # Hardcoded texts for each round
     texts = [
         "The morning breeze feels fresh and cool. Birds sing softly as the sun rises. A new day begins with endless possibilities. People step outside to enjoy the warmth. The sky turns bright with golden hues. Nature awakens with beauty and grace. Trees sway gently as leaves rustle in the wind. The distant mountains glow in the soft light. Flowers bloom with vibrant colors, welcoming the day. Streets begin to fill with people starting their routines. The sound of footsteps echoes on quiet roads. A sense of peace fills the crisp morning air.",
@@ -22,11 +60,12 @@ def load_texts_from_files():
     return texts
 
 class ResultsPage(tk.Frame):
-    def __init__(self, parent, all_scores, user_name):
+    def __init__(self, parent, all_scores, user_name, store=None):
         super().__init__(parent, bg="#2C3E50")
         self.parent = parent
-        self.all_scores = all_scores
+        self.all_scores = all_scores  # RoundResult per round
         self.user_name = user_name
+        self.store = store
         
         # Calculate average score
         self.calculate_average_scores()
@@ -35,30 +74,11 @@ class ResultsPage(tk.Frame):
         self.create_widgets()
     
     def calculate_average_scores(self):
-        # Extract numeric values from score strings
-        self.avg_wpm = 0
-        self.avg_accuracy = 0
-        self.avg_error_rate = 0
-        count = 0
-        
-        for score_text in self.all_scores:
-            try:
-                lines = score_text.split('\n')
-                for line in lines:
-                    if "Net WPM:" in line:
-                        self.avg_wpm += int(line.split(":")[1].strip())
-                    elif "Word Accuracy:" in line:
-                        self.avg_accuracy += float(line.split(":")[1].strip().replace('%', ''))
-                    elif "Error Rate:" in line:
-                        self.avg_error_rate += float(line.split(":")[1].strip().replace('%', ''))
-                count += 1
-            except (ValueError, IndexError) as e:
-                print(f"Error parsing scores: {e}")
-        
-        if count > 0:
-            self.avg_wpm /= count
-            self.avg_accuracy /= count
-            self.avg_error_rate /= count
+        # Aggregated once, numerically, over all rounds
+        self.summary = ScoreSummary(self.all_scores)
+        self.avg_wpm = self.summary.avg_wpm
+        self.avg_accuracy = self.summary.avg_accuracy
+        self.avg_error_rate = self.summary.avg_error_rate
     
     def create_widgets(self):
         # Configure the frame to expand
@@ -188,6 +208,33 @@ class ResultsPage(tk.Frame):
                 fg="#2ECC71"
             ).pack(pady=10)
         
+        # Best and worst rounds and consistency
+        if self.summary.count > 1:
+            spread = [
+                ("🏅 Best Round", f"Round {self.summary.best.round_number}: {self.summary.best.net_wpm} WPM"),
+                ("🐢 Worst Round", f"Round {self.summary.worst.round_number}: {self.summary.worst.net_wpm} WPM"),
+                ("📈 WPM Std Dev", f"{self.summary.wpm_stdev:.1f}")
+            ]
+            for i, (label_text, value_text) in enumerate(spread):
+                frame = tk.Frame(scores_grid, bg="#34495E", padx=15, pady=15)
+                frame.grid(row=1, column=i, sticky="nsew")
+                
+                tk.Label(
+                    frame,
+                    text=label_text,
+                    font=("Helvetica", 14),
+                    bg="#34495E",
+                    fg="#3498DB"
+                ).pack()
+                
+                tk.Label(
+                    frame,
+                    text=value_text,
+                    font=("Helvetica", 16, "bold"),
+                    bg="#34495E",
+                    fg="#ECF0F1"
+                ).pack(pady=5)
+        
         # Add a separator
         separator2 = ttk.Separator(self.scrollable_frame, orient='horizontal')
         separator2.pack(fill='x', padx=50, pady=20)
@@ -205,7 +252,7 @@ class ResultsPage(tk.Frame):
         ).pack(pady=10)
         
         # Create a card for each round's results
-        for i, score in enumerate(self.all_scores):
+        for score in self.all_scores:
             round_card = tk.Frame(
                 round_results_frame,
                 bg="#34495E",
@@ -216,31 +263,44 @@ class ResultsPage(tk.Frame):
             )
             round_card.pack(fill="x", pady=10)
             
-            # Extract round number
-            round_num = i + 1
-            
             # Round header
             tk.Label(
                 round_card,
-                text=f"Round {round_num}",
+                text=f"Round {score.round_number}",
                 font=("Helvetica", 18, "bold"),
                 bg="#34495E",
                 fg="#ECF0F1"
             ).pack(anchor="w")
             
-            # Format the score text
-            formatted_score = self.format_score_text(score)
-            
             # Score details
             tk.Label(
                 round_card,
-                text=formatted_score,
+                text=score.format(),
                 font=("Helvetica", 14),
                 bg="#34495E",
                 fg="#ECF0F1",
                 justify=tk.LEFT
             ).pack(anchor="w", pady=5)
         
+        # Key heatmap and history over every round the user has played,
+        # read on the store's worker behind this session's rounds. The page
+        # shows straight away and the sections fill in when the rows arrive.
+        if self.store is not None:
+            self.store_frame = tk.Frame(self.scrollable_frame, bg="#2C3E50")
+            self.store_frame.pack(fill="x")
+            self.loading_label = tk.Label(
+                self.store_frame,
+                text="Loading your history...",
+                font=("Helvetica", 12, "italic"),
+                bg="#2C3E50",
+                fg="#95A5A6"
+            )
+            self.loading_label.pack(pady=20)
+            when_fetched(self, [
+                self.store.fetch("key_stats", self.user_name),
+                self.store.fetch("key_stats", self.user_name, kind="bigram", limit=5, min_attempts=5),
+            ], self.show_store_sections)
+        
         # Bottom buttons frame
         button_frame = tk.Frame(self.scrollable_frame, bg="#2C3E50")
         button_frame.pack(pady=30)
@@ -286,14 +346,64 @@ class ResultsPage(tk.Frame):
         )
         footer_text.pack()
     
-    def format_score_text(self, score_text):
-        # Remove the "Round X Score:" part if it exists
-        lines = score_text.split('\n')
-        if lines and "Round" in lines[0] and "Score" in lines[0]:
-            lines = lines[1:]
-        
-        # Format the remaining lines
-        return '\n'.join(lines)
+    def show_store_sections(self, keys, bigrams):
+        self.loading_label.destroy()
+        self.create_heatmap(keys, bigrams)
+        self.create_history()
+    
+    def create_heatmap(self, keys, bigrams):
+        # Rows from the per-user aggregate table
+        if not keys:
+            return
+        
+        separator = ttk.Separator(self.store_frame, orient='horizontal')
+        separator.pack(fill='x', padx=50, pady=20)
+        
+        heatmap_frame = tk.Frame(self.store_frame, bg="#34495E", padx=30, pady=20)
+        heatmap_frame.pack(padx=50, pady=10, fill="x")
+        
+        tk.Label(
+            heatmap_frame,
+            text="⌨️ Your Key Heatmap ⌨️",
+            font=("Helvetica", 20, "bold"),
+            bg="#34495E",
+            fg="#ECF0F1"
+        ).pack(pady=(0, 15))
+        
+        KeyHeatmap(heatmap_frame, keys).pack()
+        
+        if bigrams:
+            lines = [
+                f"'{sequence}': {errors / attempts * 100:.0f}% errors"
+                + (f", {latency_ms / timed:.0f}ms" if timed else "")
+                for sequence, attempts, errors, latency_ms, timed in bigrams
+            ]
+            tk.Label(
+                heatmap_frame,
+                text="Trickiest letter pairs\n" + "\n".join(lines),
+                font=("Helvetica", 14),
+                bg="#34495E",
+                fg="#ECF0F1",
+                justify=tk.LEFT
+            ).pack(anchor="w", pady=(15, 0))
+    
+    def create_history(self):
+        # Pages are loaded from the database as the list scrolls
+        separator = ttk.Separator(self.store_frame, orient='horizontal')
+        separator.pack(fill='x', padx=50, pady=20)
+        
+        history_frame = tk.Frame(self.store_frame, bg="#34495E", padx=30, pady=20)
+        history_frame.pack(padx=50, pady=10, fill="x")
+        
+        tk.Label(
+            history_frame,
+            text="🗂️ Your History 🗂️",
+            font=("Helvetica", 20, "bold"),
+            bg="#34495E",
+            fg="#ECF0F1"
+        ).pack(pady=(0, 15))
+        
+        HistoryBrowser(history_frame, self.store, self.user_name).pack(fill="x")
     
     def restart_test(self):
         # Hide the results page
@@ -305,7 +415,8 @@ class ResultsPage(tk.Frame):
         self.parent.show_name_frame()
     
     def exit_app(self):
-        self.master.destroy()
+        # Close the whole window so the app can flush pending results
+        self.winfo_toplevel().destroy()
     
     def _on_mousewheel(self, event):
         self.canvas.yview_scroll(-1 * (event.delta // 120), "units")
@@ -325,38 +436,70 @@ class TypingTest:
         except:
             pass  # If the attribute is not supported, use the geometry method above
         
-        # Initialize variables
+        # Initialize variables. Round count, time limit and how passages are
+        # cut all come from the test mode; each round's passage is prepared
+        # with its metadata up front.
+        self.config = mode_from_argv()
         self.round_index = 0
-        self.rounds = load_texts_from_files()
+        self.sampler = open_sampler()
+        self.texts = load_texts_from_files(sampler=self.sampler)
+        self.rounds = self.config.passages(self.texts)
         self.text = ""
         self.start_time = None
-        self.time_left = 60
-        self.timer_running = False
-        self.timer_thread = None
+        self.timer = CountdownTimer(root, self.config.time_limit, self.update_timer, self.time_up)
         self.user_name = ""
         self.all_scores = []
-        self.typing_sound = None
         self.consecutive_errors = 0
+        self.session = TypingSession(time_limit=self.config.time_limit)
+        # Input is recorded per change but drawn once per frame: the pending
+        # redraw job, when the frame's first change arrived, and the passage
+        # range whose status changed since the last redraw
+        self._frame_job = None
+        self._frame_started = None
+        self._dirty = None
+        
+        # Latency histograms for the key handlers (--instrument)
+        enabled, export_path = instrumentation.options_from_argv()
+        self.instrumentation = instrumentation.Instrumentation(root, enabled, export_path)
+        self.on_input = self.instrumentation.wrap("on_input", self.on_input)
+        self.check_typing = self.instrumentation.wrap("check_typing", self.check_typing)
+        self.update_prompt_highlighting = self.instrumentation.wrap(
+            "highlighting", self.update_prompt_highlighting
+        )
+        self.assets = AssetCache(root)
+        # Key clicks; the mixer opens in the background and stays silent
+        # without pygame or an audio device
+        self.sounds = sound.KeySounds(sound.enabled_from_argv(), self.instrumentation)
         
         # Create main frame
         self.main_frame = tk.Frame(root, bg="#2C3E50")
         self.main_frame.pack(expand=True, fill="both")
         
-        # Initialize database
-        self.init_database()
+        # Results are written by a background worker owning one connection
+        with startup.profile.phase("result store"):
+            self.store = ResultStore()
+        
+        # Lab mode: also stream results to a central collector. Imported only
+        # when configured, to keep asyncio out of the normal startup path.
+        self.collector = None
+        if "--collector" in sys.argv or os.environ.get("TYPINGTEST_COLLECTOR"):
+            import collector
+            address = collector.address_from_argv()
+            if address:
+                self.collector = collector.CollectorClient(*address)
         
         # Create UI frames
-        self.create_name_frame()
+        with startup.profile.phase("name frame"):
+            self.create_name_frame()
         
-        # Create main content frame (initially hidden)
-        self.create_main_content()
+        # The main content (logo, prompt, timer) is built once the name
+        # screen has been painted, so it never delays the first window
+        self.main_content = None
+        self.root.after_idle(lambda: self.root.after(0, self.on_first_paint))
         
         # Show the name frame on startup
         self.show_name_frame()  # <-- Add this line
         
-        # Initialize pygame mixer for sound
-        pygame.mixer.init()
-        
         # Initialize round_scores to store all metrics
         self.round_scores = {}
         
@@ -364,40 +507,6 @@ class TypingTest:
         self.reset_count = 0
         self.max_resets = 3
     
-    def init_database(self):
-        try:
-            # Try both database names
-            for db_name in ['typing_scores.db', 'typing_test.db']:
-                try:
-                    conn = sqlite3.connect(db_name)
-                    cursor = conn.cursor()
-                    
-                    # Create table if it doesn't exist
-                    cursor.execute('''
-                        CREATE TABLE IF NOT EXISTS typing_results (
-                            id INTEGER PRIMARY KEY AUTOINCREMENT,
-                            user_name TEXT,
-                            round_number INTEGER,
-                            gross_wpm INTEGER,
-                            net_wpm INTEGER,
-                            accuracy REAL,
-                            error_rate REAL,
-                            timestamp REAL
-                        )
-                    ''')
-                    
-                    conn.commit()
-                    conn.close()
-                    self.db_name = db_name  # Store the successful database name
-                    print(f"Successfully connected to {db_name}")
-                    break
-                except Exception as e:
-                    print(f"Failed to connect to {db_name}: {e}")
-                    continue
-        except Exception as e:
-            print(f"Database initialization error: {e}")
-            self.db_name = 'typing_scores.db'  # Default to this if all fails
-    
     def create_name_frame(self):
         # Create the name entry frame (DON'T PACK HERE)
         self.name_frame = tk.Frame(self.main_frame, bg="#2C3E50")
@@ -425,6 +534,28 @@ class TypingTest:
         
         self.name_entry.bind("<Return>", lambda event: self.start_test())
         
+        # Test mode, preselected from --mode
+        self.mode_choices = {config.label: config for config in MODES.values()}
+        self.mode_var = tk.StringVar(value=self.config.label)
+        mode_label = tk.Label(
+            self.name_frame,
+            text="Test mode:",
+            font=("Helvetica", 14),
+            bg="#2C3E50",
+            fg="#ECF0F1"
+        )
+        mode_label.pack(pady=(10, 5))
+        mode_menu = tk.OptionMenu(self.name_frame, self.mode_var, *self.mode_choices)
+        mode_menu.config(
+            font=("Helvetica", 12),
+            bg="#34495E",
+            fg="#ECF0F1",
+            activebackground="#3498DB",
+            relief=tk.FLAT,
+            highlightthickness=0
+        )
+        mode_menu.pack(pady=(0, 10))
+        
         start_button = tk.Button(
             self.name_frame,
             text="Start Test",
@@ -439,9 +570,22 @@ class TypingTest:
         )
         start_button.pack(pady=20)
 
+    def on_first_paint(self):
+        startup.profile.mark("name screen painted")
+        if startup.first_window(self.root):
+            startup.profile.report()
+            return
+        with startup.profile.phase("main content"):
+            self.ensure_main_content()
+        startup.profile.report()
+    
+    def ensure_main_content(self):
+        if self.main_content is None:
+            self.create_main_content()
+    
     def show_name_frame(self):
     # Hide main content and show name frame
-        if self.main_content.winfo_ismapped():
+        if self.main_content is not None and self.main_content.winfo_ismapped():
             self.main_content.pack_forget()
         self.name_frame.pack(expand=True, fill="both")
     
@@ -492,9 +636,9 @@ class TypingTest:
         
         # Load and display logo
         try:
-            png_data = cairosvg.svg2png(url="logo.svg", output_width=120, output_height=120)
-            logo_image = Image.open(io.BytesIO(png_data))
-            logo_photo = ImageTk.PhotoImage(logo_image)
+            # Served from the asset cache; only rendered when the SVG changes
+            with startup.profile.phase("logo"):
+                logo_photo = self.assets.photo("logo.svg", 120, 120)
             
             logo_label = tk.Label(
                 header_frame,
@@ -524,23 +668,43 @@ class TypingTest:
         # Add round indicator
         self.round_indicator = tk.Label(
             self.content_frame,
-            text="Test 1 of 3",
+            text=self.config.round_label(0),
             font=("Helvetica", 16, "bold"),
             bg="#2C3E50",
             fg="#ECF0F1"
         )
         self.round_indicator.pack(pady=10)
         
+        # What the passage asks for: length and the keys that slow typing
+        self.passage_label = tk.Label(
+            self.content_frame,
+            text="",
+            font=("Helvetica", 11),
+            bg="#2C3E50",
+            fg="#95A5A6"
+        )
+        self.passage_label.pack(pady=(0, 5))
+        
         # Add timer label
         self.timer_label = tk.Label(
             self.content_frame,
-            text="Time: 60s",
+            text=self.timer_text(),
             font=("Helvetica", 20, "bold"),
             bg="#2C3E50",
             fg="#ECF0F1"
         )
         self.timer_label.pack(pady=(10, 5))
         
+        # Live speed and accuracy while typing
+        self.live_label = tk.Label(
+            self.content_frame,
+            text="",
+            font=("Helvetica", 14),
+            bg="#2C3E50",
+            fg="#3498DB"
+        )
+        self.live_label.pack(pady=(0, 5))
+        
         # Create text widget for prompt
         self.prompt_label = tk.Text(
             self.content_frame,
@@ -562,6 +726,8 @@ class TypingTest:
         self.prompt_label.tag_configure("correct", foreground="#2ECC71")
         self.prompt_label.tag_configure("incorrect", foreground="#E74C3C")
         self.prompt_label.tag_configure("default", foreground="#ECF0F1")
+        self.prompt_label.tag_configure("current_word", underline=True)
+        self.highlighter = PromptHighlighter(self.prompt_label)
         
         # Create and bind the entry widget
         self.typed_text = tk.StringVar()
@@ -582,8 +748,9 @@ class TypingTest:
         )
         self.entry.pack(fill=tk.X, padx=60, pady=20)
         
-        # Bind both events to the entry
-        self.entry.bind("<KeyRelease>", self.check_typing)
+        # Every change to the entry (keys, key repeat, pastes) is recorded as
+        # it happens; Return submits
+        self.typed_text.trace_add("write", self.on_input)
         self.entry.bind("<Return>", self.calculate_results)
         
         # Add result label
@@ -677,55 +844,17 @@ class TypingTest:
         footer_text.bind("<Enter>", on_enter)
         footer_text.bind("<Leave>", on_leave)
     
-    def init_database(self):
-        try:
-            # Try both database names
-            for db_name in ['typing_scores.db', 'typing_test.db']:
-                try:
-                    conn = sqlite3.connect(db_name)
-                    cursor = conn.cursor()
-                    
-                    # Create table if it doesn't exist
-                    cursor.execute('''
-                        CREATE TABLE IF NOT EXISTS typing_results (
-                            id INTEGER PRIMARY KEY AUTOINCREMENT,
-                            user_name TEXT,
-                            round_number INTEGER,
-                            gross_wpm INTEGER,
-                            net_wpm INTEGER,
-                            accuracy REAL,
-                            error_rate REAL,
-                            timestamp REAL
-                        )
-                    ''')
-                    
-                    conn.commit()
-                    conn.close()
-                    self.db_name = db_name  # Store the successful database name
-                    print(f"Successfully connected to {db_name}")
-                    break
-                except Exception as e:
-                    print(f"Failed to connect to {db_name}: {e}")
-                    continue
-        except Exception as e:
-            print(f"Database initialization error: {e}")
-            self.db_name = 'typing_scores.db'  # Default to this if all fails
-    
     def start_timer(self):
-        self.timer_running = True
-        self.timer_thread = threading.Thread(target=self.update_timer)
-        self.timer_thread.daemon = True  # Thread will close with main program
-        self.timer_thread.start()
+        # Ticks are scheduled on the Tk event loop against a monotonic deadline
+        self.timer.start()
     
-    def update_timer(self):
-        while self.timer_running and self.time_left > 0:
-            mins, secs = divmod(self.time_left, 60)
-            self.timer_label.config(text=f"Time: {mins:02d}:{secs:02d}")
-            time.sleep(1)
-            self.time_left -= 1
-            
-        if self.time_left <= 0:
-            self.root.after(0, self.time_up)
+    def update_timer(self, remaining):
+        # Remaining time, or time so far in untimed modes
+        self.timer_label.config(text=f"Time: {format_time(remaining)}")
+    
+    def timer_text(self):
+        # Before the first key: the full limit, or zero when counting up
+        return f"Time: {format_time(self.config.time_limit or 0)}"
     
     def time_up(self):
         if self.entry['state'] != 'disabled':  # Only if test hasn't been submitted
@@ -735,134 +864,160 @@ class TypingTest:
             # Auto-advance to next round after a short delay
             self.root.after(2000, self.next_round)
     
-    def check_typing(self, event):
-        if self.start_time is None and self.typed_text.get():
-            self.start_time = time.time()
+    def on_input(self, *args):
+        # Timestamp and score the change now; the redraw, live score and
+        # auto-submit check run once the pending events are handled
+        if self.entry['state'] == 'disabled':
+            return
+        event_time = time.perf_counter()
+        now = time.monotonic()
+        typed = self.typed_text.get()
+        if self.start_time is None:
+            if not typed:
+                return
+            self.start_time = now
             self.start_timer()
         
-        typed = self.typed_text.get()
-        self.update_prompt_highlighting(typed)
+        aligner = self.session.score.aligner
+        previous_length = len(self.session.typed)
+        previous_distance = aligner.distance
+        self.session.apply(typed, now)
+        
+        # Sound goes out right away, not with the next frame
+        if len(typed) == previous_length + 1:
+            self.sounds.play(sound.ERROR if aligner.distance > previous_distance else sound.CLICK, event_time)
+        elif len(typed) == previous_length - 1:
+            self.sounds.play(sound.CLICK, event_time)
+        
+        start, end = aligner.changed
+        if start < end:
+            if self._dirty is None:
+                self._dirty = (start, end)
+            else:
+                self._dirty = (min(self._dirty[0], start), max(self._dirty[1], end))
+        if self._frame_job is None:
+            self._frame_started = time.perf_counter()
+            self._frame_job = self.root.after_idle(self.check_typing)
+    
+    def check_typing(self):
+        # One redraw for however many changes arrived since the last frame
+        self._frame_job = None
+        self.update_prompt_highlighting()
+        self.update_live_score()
+        self.instrumentation.key_event(self._frame_started)
         
         # Auto-submit if typed length matches text length
-        if len(typed) >= len(self.text):
+        if self.session.complete:
             self.calculate_results(None)  # Pass None as event
     
-    def update_prompt_highlighting(self, typed):
-        self.prompt_label.config(state='normal')
-        self.prompt_label.delete(1.0, tk.END)
-        
-        # Insert the full text first
-        self.prompt_label.insert(tk.END, self.text)
-        
-        # Apply highlighting for each character
-        for i, (typed_char, text_char) in enumerate(zip(typed, self.text)):
-            start_pos = f"1.{i}"
-            end_pos = f"1.{i + 1}"
-            
-            if typed_char == text_char:
-                self.prompt_label.tag_add("correct", start_pos, end_pos)
-            else:
-                self.prompt_label.tag_add("incorrect", start_pos, end_pos)
-        
-        # Ensure text is visible
-        self.prompt_label.see("1.0")
-        self.prompt_label.config(state='disabled')
+    def cancel_input_frame(self):
+        if self._frame_job is not None:
+            self.root.after_cancel(self._frame_job)
+            self._frame_job = None
+        self._dirty = None
+    
+    def update_prompt_highlighting(self):
+        # Tags follow the alignment, so only characters whose status changed
+        # since the last redraw are retagged, and the word underline only
+        # moves when the typist reaches another word
+        aligner = self.session.score.aligner
+        start, end = self._dirty or (0, 0)
+        self._dirty = None
+        self.highlighter.show(aligner.status, start, end, aligner.row, aligner.word_span())
+    
+    def update_live_score(self):
+        if self.start_time is None:
+            return
+        score = self.session.score
+        elapsed_time = self.timer.elapsed()
+        self.live_label.config(
+            text=f"Net WPM: {score.net_wpm(elapsed_time)}   "
+                 f"Accuracy: {score.char_accuracy():.1f}%   "
+                 f"Words: {score.correct_words}/{score.aligner.passage_words}"
+        )
     
     def calculate_results(self, event=None):
         if self.start_time is None or self.entry['state'] == 'disabled':
             return
         
-        # Stop the timer
-        self.timer_running = False
-        if self.timer_thread:
-            self.timer_thread.join(0)
-        
-        # Calculate metrics...
-        end_time = time.time()
-        elapsed_time = min(end_time - self.start_time, 60)
-        minutes = elapsed_time / 60
-        typed = self.typed_text.get()
-        
-        # Calculate scores...
-        typed_words = typed.split()
-        correct_words = self.text.split()
-        min_len = min(len(typed_words), len(correct_words))
-        correct_word_count = sum(1 for i in range(min_len) if typed_words[i] == correct_words[i])
-        total_words = max(len(typed_words), len(correct_words))
-        word_accuracy = (correct_word_count / total_words) * 100 if total_words > 0 else 0
-        
-        total_keystrokes = len(typed)
-        errors = sum(1 for i, char in enumerate(typed) if i < len(self.text) and char != self.text[i])
-        error_percentage = (errors / total_keystrokes * 100) if total_keystrokes > 0 else 0
+        # Stop the timer; elapsed time is frozen at this instant
+        self.timer.cancel()
         
-        gross_wpm = int((total_keystrokes / 5) / minutes)
-        net_wpm = int(((total_keystrokes - errors) / 5) / minutes)
+        # Draw any input still waiting for its frame
+        if self._frame_job is not None:
+            self.root.after_cancel(self._frame_job)
+            self._frame_job = None
+            self.update_prompt_highlighting()
         
-        # Update database with name and results
-        try:
-            conn = sqlite3.connect(self.db_name)
-            cursor = conn.cursor()
-            
-            # Insert results
-            cursor.execute('''
-                INSERT INTO typing_results 
-                (user_name, round_number, gross_wpm, net_wpm, accuracy, error_rate, timestamp)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                self.user_name,
-                self.round_index + 1,
-                gross_wpm,
-                net_wpm,
-                word_accuracy,
-                error_percentage,
-                time.time()
-            ))
-            
-            conn.commit()
-            conn.close()
-            print(f"Successfully saved results for {self.user_name} - Round {self.round_index + 1}")
-        except Exception as e:
-            print(f"Database error: {e}")
-        
-        # Format current round's results
-        current_round_text = (
-            f"Round {self.round_index + 1} Score:\n"
-            f"Time: {int(elapsed_time)}s\n"
-            f"Gross WPM: {gross_wpm}\n"
-            f"Net WPM: {net_wpm}\n"
-            f"Word Accuracy: {word_accuracy:.1f}%\n"
-            f"Error Rate: {error_percentage:.1f}%"
+        # Calculate metrics...
+        elapsed_time = self.timer.elapsed()
+        
+        # Read the running counters kept up to date by on_input
+        self.session.apply(self.typed_text.get(), time.monotonic())
+        result = self.session.results(elapsed_time, self.round_index + 1)
+        
+        # Queue the results; the store writes them off the UI thread
+        self.store.save_result(
+            self.user_name,
+            result.round_number,
+            result.gross_wpm,
+            result.net_wpm,
+            result.word_accuracy,
+            result.error_rate,
+            time.time(),
+            keylog=self.session.keylog,
+            key_stats=self.session.key_stats
         )
+        if self.collector is not None:
+            self.collector.submit(
+                (self.user_name, result.round_number, result.gross_wpm, result.net_wpm,
+                 result.word_accuracy, result.error_rate, time.time()),
+                keylog=self.session.keylog
+            )
         
         # Store the score
-        self.all_scores.append(current_round_text)
+        self.all_scores.append(result)
         
-                # Update UI with results
+        # Update UI with results
         self.entry.config(state='disabled')
-        result_text = (
-            f"Gross WPM: {gross_wpm}\n"
-            f"Net WPM: {net_wpm}\n"
-            f"Word Accuracy: {word_accuracy:.1f}%\n"
-            f"Error Rate: {error_percentage:.1f}%"
-        )
-        self.result_label.config(text=result_text)
+        self.result_label.config(text=result.format(with_time=False))
 
-        # Show appropriate buttons
-        if self.round_index < len(self.rounds) - 1:
+        # Show appropriate buttons; an endless test can be ended after any round
+        if self.config.has_next(self.round_index):
             self.next_button.pack(side=tk.LEFT, padx=10)
         else:
-            self.results_button.pack(side=tk.LEFT, padx=10)
             self.next_button.pack_forget()
+        if self.config.endless or not self.config.has_next(self.round_index):
+            self.results_button.pack(side=tk.LEFT, padx=10)
 
     def next_round(self):
-        if self.round_index < len(self.rounds) - 1:
+        if self.config.has_next(self.round_index):
             self.round_index += 1
             self.reset_test(full_reset=False)
-            self.title_label.config(text=f"Typing Test - Round {self.round_index + 1}")
-            self.round_indicator.config(text=f"Test {self.round_index + 1} of 3")
+            self.update_round_labels()
+            if self.round_index + 1 >= len(self.rounds):
+                # Endless: prepare more passages while this round is typed
+                self.root.after_idle(self.extend_rounds)
         else:
             self.show_results()
 
+    def extend_rounds(self):
+        self.rounds += self.config.passages(load_texts_from_files(sampler=self.sampler))
+
+    def update_round_labels(self):
+        self.title_label.config(text=f"Typing Test - Round {self.round_index + 1}")
+        self.round_indicator.config(text=self.config.round_label(self.round_index))
+
+    def apply_config(self, config):
+        # A new test in the chosen mode, from its first round
+        self.config = config
+        self.timer.reset()
+        self.timer.duration = config.time_limit
+        self.session.time_limit = config.time_limit
+        self.round_index = 0
+        self.rounds = config.passages(self.texts)
+        self.all_scores = []
+
     def reset_test(self, full_reset=True):
         if self.reset_count >= self.max_resets:
             messagebox.showwarning("Reset Limit", "You've used all your resets!")
@@ -874,29 +1029,34 @@ class TypingTest:
 
         # Reset test parameters
         self.start_time = None
-        self.time_left = 60
-        self.timer_running = False
+        self.timer.reset()
         self.typed_text.set("")
         self.entry.config(state='normal')
         self.result_label.config(text="")
-        self.prompt_label.config(state='normal')
-        self.prompt_label.delete(1.0, tk.END)
-        self.prompt_label.insert(tk.END, self.text)
-        self.prompt_label.config(state='disabled')
-        self.timer_label.config(text="Time: 60s", fg="#ECF0F1")
+        self.live_label.config(text="")
+        self.timer_label.config(text=self.timer_text(), fg="#ECF0F1")
         
         # Reload the current round's text
-        self.text = self.rounds[self.round_index]
-        self.prompt_label.config(state='normal')
-        self.prompt_label.delete(1.0, tk.END)
-        self.prompt_label.insert(tk.END, self.text)
-        self.prompt_label.config(state='disabled')
+        self.cancel_input_frame()
+        self.load_passage()
         self.entry.focus_set()
 
+    def load_passage(self):
+        # The current round's passage into the prompt and the session; its
+        # metadata was computed when the rounds were prepared
+        self.text = self.rounds[self.round_index]
+        self.session.load(self.text)
+        self.highlighter.load(self.text, self.session.score.aligner.word_span())
+        info = passage_info(self.text)
+        self.passage_label.config(
+            text=f"{info.words} words, {len(info)} characters, {info.keystrokes} key presses "
+                 f"({info.uppercase} capitals, {info.digits} digits, {info.punctuation} symbols)"
+        )
+
     def show_results(self):
         # Hide main content and show results page
         self.main_content.pack_forget()
-        ResultsPage(self.main_frame, self.all_scores, self.user_name)
+        ResultsPage(self.main_frame, self.all_scores, self.user_name, self.store)
 
     def start_test(self):
         self.user_name = self.name_entry.get().strip()
@@ -904,22 +1064,34 @@ class TypingTest:
             messagebox.showerror("Name Required", "Please enter your name to continue!")
             return
 
+        self.apply_config(self.mode_choices[self.mode_var.get()])
         self.name_frame.pack_forget()
+        self.ensure_main_content()
+        self.update_round_labels()
+        self.timer_label.config(text=self.timer_text(), fg="#ECF0F1")
         self.main_content.pack(expand=True, fill="both")
-        self.text = self.rounds[self.round_index]
-        self.prompt_label.config(state='normal')
-        self.prompt_label.insert(tk.END, self.text)
-        self.prompt_label.config(state='disabled')
+        self.cancel_input_frame()
+        self.load_passage()
         self.entry.focus_set()
 
     def destroy_frames(self):
         for widget in self.main_frame.winfo_children():
             widget.destroy()
+        self.main_content = None
 
     def _on_mousewheel(self, event):
         self.canvas.yview_scroll(-1 * (event.delta // 120), "units")
 
 if __name__ == "__main__":
-    root = tk.Tk()
-    app = TypingTest(root)
-    root.mainloop()
\ No newline at end of file
+    with startup.profile.phase("Tk root"):
+        root = tk.Tk()
+    with startup.profile.phase("TypingTest init"):
+        app = TypingTest(root)
+    root.mainloop()
+    app.store.close()
+    app.sounds.close()
+    if app.collector is not None:
+        app.collector.close()
+    if app.sampler is not None:
+        app.sampler.selection.corpus.close()
+    app.instrumentation.export()
\ No newline at end of file
@@ -0,0 +1,99 @@
+import base64
+import hashlib
+import os
+import sys
+import tkinter as tk
+
+# Upper bound for everything in the cache directory, and for a single entry
+MAX_CACHE_BYTES = 8 * 1024 * 1024
+MAX_ENTRY_BYTES = 2 * 1024 * 1024
+
+
+def default_cache_dir():
+    override = os.environ.get("TYPINGTEST_CACHE_DIR")
+    if override:
+        return override
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+        return os.path.join(base, "TypingTest", "cache")
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "typingtest")
+
+
+class AssetCache:
+    # Rasterized SVG assets, cached on disk and in memory.
+    # Rendered PNGs are stored under a name built from the SVG's content hash
+    # and the target size, so editing the SVG or asking for another size never
+    # serves a stale image. A cache hit is decoded straight into a Tk
+    # PhotoImage, so cairosvg is only imported when something must be
+    # rendered. Decoded images stay in memory for frame rebuilds.
+
+    def __init__(self, root, cache_dir=None, max_bytes=MAX_CACHE_BYTES):
+        self.root = root
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.max_bytes = max_bytes
+        self._photos = {}
+
+    def photo(self, svg_path, width, height):
+        key = (os.path.abspath(svg_path), width, height)
+        photo = self._photos.get(key)
+        if photo is None:
+            png_data = self.png(svg_path, width, height)
+            photo = tk.PhotoImage(master=self.root, data=base64.b64encode(png_data))
+            self._photos[key] = photo
+        return photo
+
+    def png(self, svg_path, width, height):
+        with open(svg_path, "rb") as f:
+            svg_data = f.read()
+
+        prefix = f"{os.path.splitext(os.path.basename(svg_path))[0]}-{width}x{height}-"
+        digest = hashlib.sha256(svg_data).hexdigest()[:16]
+        entry = os.path.join(self.cache_dir, f"{prefix}{digest}.png")
+
+        try:
+            with open(entry, "rb") as f:
+                png_data = f.read()
+            os.utime(entry)  # Mark as recently used
+            return png_data
+        except OSError:
+            pass
+
+        import cairosvg
+        png_data = cairosvg.svg2png(bytestring=svg_data, output_width=width, output_height=height)
+        self._store(entry, prefix, png_data)
+        return png_data
+
+    def _store(self, entry, prefix, png_data):
+        if len(png_data) > MAX_ENTRY_BYTES:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f"{entry}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(png_data)
+            os.replace(tmp_path, entry)
+            self._evict(entry, prefix)
+        except OSError as e:
+            print(f"Asset cache error: {e}")
+
+    def _evict(self, keep, prefix):
+        # Drop renders of older versions of the same asset at this size, then
+        # the least recently used entries until the cache fits its budget
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if not name.endswith(".png") or path == keep:
+                continue
+            if name.startswith(prefix):
+                os.remove(path)
+                continue
+            stat = os.stat(path)
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = os.path.getsize(keep) + sum(size for _, size, _ in entries)
+        entries.sort()
+        while entries and total > self.max_bytes:
+            _, size, path = entries.pop(0)
+            os.remove(path)
+            total -= size
@@ -0,0 +1,93 @@
+# Cost of Aligner.update as the passage grows, without a display.
+#
+#   python benchmarks/bench_alignment.py
+#
+# Reports the mean time per keystroke over the last KEYSTROKES keys of a
+# passage (with typos fixed by backspace), the time to paste a whole
+# passage into an empty round, and the time to paste PASTE_CHARS characters
+# over a mistyped stretch early in a half-typed passage (everything typed
+# after the stretch is aligned again).
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from alignment import Aligner
+
+WORDS = "the quick brown fox jumps over lazy dog typing test round score".split()
+SIZES = [500, 2000, 10000, 50000, 200000]
+KEYSTROKES = 200
+PASTE_CHARS = 1000
+
+
+def make_passage(length, rng):
+    words = []
+    size = 0
+    while size < length:
+        word = rng.choice(WORDS)
+        words.append(word)
+        size += len(word) + 1
+    return " ".join(words)[:length]
+
+
+def make_keystrokes(text, rng):
+    # Typed states for the last KEYSTROKES keys: mostly correct, some
+    # mistakes that get corrected with backspace
+    prefix = text[:len(text) - KEYSTROKES]
+    typed = prefix
+    states = []
+    while len(typed) < len(text):
+        if rng.random() < 0.05:
+            states.append(typed + "x")
+            states.append(typed)
+        typed += text[len(typed)]
+        states.append(typed)
+    return prefix, states
+
+
+def bench_keys(text, rng):
+    prefix, states = make_keystrokes(text, rng)
+    aligner = Aligner(text)
+    aligner.update(prefix)
+    start = time.perf_counter()
+    for typed in states:
+        aligner.update(typed)
+    return (time.perf_counter() - start) / len(states)
+
+
+def bench_paste(text):
+    aligner = Aligner(text)
+    start = time.perf_counter()
+    aligner.update(text)
+    return time.perf_counter() - start
+
+
+def bench_paste_over(text):
+    # Half the passage typed with every fifth character wrong over
+    # PASTE_CHARS characters a quarter of the way in, then the right text
+    # pasted over that stretch
+    half = len(text) // 2
+    at = half // 4
+    garbled = "".join("x" if i % 5 == 0 else char for i, char in enumerate(text[at:at + PASTE_CHARS]))
+    aligner = Aligner(text)
+    aligner.update(text[:at] + garbled + text[at + PASTE_CHARS:half])
+    start = time.perf_counter()
+    aligner.update(text[:half])
+    return time.perf_counter() - start
+
+
+def main():
+    rng = random.Random(42)
+    print(f"{'chars':>8} {'per key':>12} {'paste all':>12} {'paste over':>12}")
+    for length in SIZES:
+        text = make_passage(length, rng)
+        per_key = bench_keys(text, rng)
+        paste = bench_paste(text)
+        paste_over = bench_paste_over(text)
+        print(f"{length:>8} {per_key * 1e6:>9.1f} us {paste * 1e3:>9.1f} ms {paste_over * 1e3:>9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
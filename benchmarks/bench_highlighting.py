@@ -0,0 +1,131 @@
+# Per-keystroke cost of prompt highlighting as the passage grows.
+#
+# Types the tail of passages of increasing length and reports the mean time
+# and the number of tag calls per keystroke, for the path the app runs on
+# every key (Aligner.update, then PromptHighlighter.show) and for the old
+# full redraw. Needs a display (run under xvfb-run on a
+# headless box):
+#
+#   python benchmarks/bench_highlighting.py
+import os
+import random
+import sys
+import time
+import tkinter as tk
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from alignment import Aligner
+from highlighting import PromptHighlighter
+
+WORDS = "the quick brown fox jumps over lazy dog typing test round score".split()
+SIZES = [500, 2000, 10000, 50000]
+KEYSTROKES = 200
+
+
+class CountingText:
+    # Forwards to the real Text widget while counting tag calls
+    def __init__(self, widget):
+        self.widget = widget
+        self.tag_calls = 0
+
+    def tag_add(self, *args):
+        self.tag_calls += 1
+        return self.widget.tag_add(*args)
+
+    def tag_remove(self, *args):
+        self.tag_calls += 1
+        return self.widget.tag_remove(*args)
+
+    def __getattr__(self, name):
+        return getattr(self.widget, name)
+
+
+def make_passage(length, rng):
+    words = []
+    size = 0
+    while size < length:
+        word = rng.choice(WORDS)
+        words.append(word)
+        size += len(word) + 1
+    return " ".join(words)[:length]
+
+
+def make_keystrokes(text, rng):
+    # Typed states for the last KEYSTROKES keys: mostly correct, some
+    # mistakes that get corrected with backspace
+    prefix = text[:len(text) - KEYSTROKES]
+    typed = prefix
+    states = []
+    while len(typed) < len(text):
+        if rng.random() < 0.05:
+            states.append(typed + "x")
+            states.append(typed)
+        typed += text[len(typed)]
+        states.append(typed)
+    return prefix, states
+
+
+def full_redraw(widget, text, typed):
+    # The previous implementation, kept for comparison
+    widget.config(state='normal')
+    widget.delete(1.0, tk.END)
+    widget.insert(tk.END, text)
+    for i, (typed_char, text_char) in enumerate(zip(typed, text)):
+        tag = "correct" if typed_char == text_char else "incorrect"
+        widget.tag_add(tag, f"1.{i}", f"1.{i + 1}")
+    widget.see("1.0")
+    widget.config(state='disabled')
+
+
+def bench(root, length, rng):
+    text = make_passage(length, rng)
+    prefix, states = make_keystrokes(text, rng)
+
+    widget = tk.Text(root, wrap=tk.WORD)
+    widget.pack()
+    counting = CountingText(widget)
+    highlighter = PromptHighlighter(counting)
+    highlighter.load(text)
+    aligner = Aligner(text)
+    aligner.update(prefix)
+    highlighter.show(aligner.status, 0, len(prefix), aligner.row, aligner.word_span())
+    root.update()
+
+    counting.tag_calls = 0
+    start = time.perf_counter()
+    for typed in states:
+        aligner.update(typed)
+        start_pos, end_pos = aligner.changed
+        highlighter.show(aligner.status, start_pos, end_pos, aligner.row, aligner.word_span())
+        root.update_idletasks()
+    incremental = (time.perf_counter() - start) / len(states)
+    calls = counting.tag_calls / len(states)
+
+    # The full redraw is too slow to run all keystrokes on long passages
+    sample = states[:20]
+    start = time.perf_counter()
+    for typed in sample:
+        full_redraw(widget, text, typed)
+        root.update_idletasks()
+    redraw = (time.perf_counter() - start) / len(sample)
+
+    widget.destroy()
+    return incremental, calls, redraw
+
+
+def main():
+    rng = random.Random(42)
+    root = tk.Tk()
+    root.withdraw()
+
+    print(f"{'chars':>8} {'incremental':>14} {'tag calls':>10} {'full redraw':>14}")
+    for length in SIZES:
+        incremental, calls, redraw = bench(root, length, rng)
+        print(f"{length:>8} {incremental * 1e6:>11.1f} us {calls:>10.2f} {redraw * 1e6:>11.1f} us")
+
+    root.destroy()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# History and leaderboard query times over a large synthetic results table.
+#
+#   python benchmarks/bench_queries.py [rows]
+#
+# Seeds a throwaway database with `rows` results (default 1,000,000) spread
+# over a few hundred users, then times each query the app exposes.
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage import ResultStore
+
+USERS = 500
+CHUNK = 50000
+REPEAT = 50
+
+
+def seed(path, rows, rng):
+    # Let the store create the schema and indexes, then bulk load
+    store = ResultStore(db_names=[path])
+    store.close()
+
+    import sqlite3
+    conn = sqlite3.connect(path)
+    start = time.perf_counter()
+    now = time.time()
+    with conn:
+        conn.executemany('INSERT INTO users (id, name) VALUES (?, ?)', ((i + 1, f"user{i}") for i in range(USERS)))
+        for base in range(0, rows, CHUNK):
+            batch = []
+            for i in range(base, min(base + CHUNK, rows)):
+                gross = rng.randint(20, 140)
+                batch.append((
+                    rng.randrange(USERS) + 1,
+                    rng.randint(1, 3),
+                    gross,
+                    gross - rng.randint(0, 15),
+                    rng.randint(6000, 10000),
+                    rng.randint(0, 1500),
+                    int(now) - (rows - i) * 30,
+                ))
+            conn.executemany('''
+                INSERT INTO typing_results
+                (user_id, round_number, gross_wpm, net_wpm, accuracy_bp, error_rate_bp, timestamp)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', batch)
+    conn.close()
+    return time.perf_counter() - start
+
+
+def timed(fn):
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        fn()
+    return (time.perf_counter() - start) / REPEAT * 1000
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    rng = random.Random(7)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        elapsed = seed(path, rows, rng)
+        print(f"Seeded {rows} rows in {elapsed:.1f}s")
+
+        store = ResultStore(db_names=[path])
+        # Walk a few pages in to time a deep keyset seek
+        page = store.history("user42", limit=50)
+        cursor = (page[-1][7], page[-1][0])
+        for _ in range(4):
+            page = store.history("user42", limit=50, before=cursor)
+            if not page:
+                break
+            cursor = (page[-1][7], page[-1][0])
+
+        results = [
+            ("history, first page", lambda: store.history("user42", limit=50)),
+            ("history, 6th page", lambda: store.history("user42", limit=50, before=cursor)),
+            ("leaderboard top 10", lambda: store.leaderboard(10)),
+            ("leaderboard round 2 top 10", lambda: store.leaderboard(10, round_number=2)),
+            ("leaderboard page 5", lambda: store.leaderboard(10, offset=40)),
+            ("top 10 per round", lambda: store.top_per_round(10)),
+        ]
+        for name, fn in results:
+            print(f"{name:<28} {timed(fn):8.3f} ms")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
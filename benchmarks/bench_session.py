@@ -0,0 +1,127 @@
+# Replays synthetic typists through the headless TypingSession.
+#
+#   python benchmarks/bench_session.py [rounds]
+#
+# Each typist profile produces a timestamped event stream over the app's
+# passages; the stream is replayed as fast as possible and keystroke
+# throughput and peak memory (tracemalloc, measured in a separate pass) are
+# reported per profile.
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import load_texts_from_files
+from session import TypingSession
+
+TYPO_KEYS = "asdfghjkl;qwertyuiop"
+
+
+def fast_typist(text, rng):
+    # ~120 WPM, rare typos fixed immediately
+    t = 0.0
+    for char in text:
+        t += rng.uniform(0.06, 0.14)
+        if rng.random() < 0.02:
+            yield ("char", rng.choice(TYPO_KEYS), t)
+            t += rng.uniform(0.1, 0.2)
+            yield ("backspace", None, t)
+            t += rng.uniform(0.05, 0.1)
+        yield ("char", char, t)
+
+
+def error_prone_typist(text, rng):
+    # ~50 WPM, frequent typos, sometimes noticed a few keys later
+    t = 0.0
+    typed = 0
+    while typed < len(text):
+        t += rng.uniform(0.15, 0.35)
+        if rng.random() < 0.1:
+            run = rng.randint(1, 4)
+            for _ in range(run):
+                yield ("char", rng.choice(TYPO_KEYS), t)
+                t += rng.uniform(0.15, 0.3)
+            if rng.random() < 0.7:
+                for _ in range(run):
+                    yield ("backspace", None, t)
+                    t += rng.uniform(0.08, 0.15)
+            else:
+                typed += run
+                continue
+        yield ("char", text[typed], t)
+        typed += 1
+
+
+def paste_heavy_typist(text, rng):
+    # Types a few words, then pastes whole sentences
+    t = 0.0
+    pos = 0
+    while pos < len(text):
+        if rng.random() < 0.3:
+            end = text.find(". ", pos)
+            end = len(text) if end == -1 else end + 2
+            t += rng.uniform(0.3, 0.6)
+            yield ("paste", text[pos:end], t)
+            pos = end
+        else:
+            t += rng.uniform(0.08, 0.2)
+            yield ("char", text[pos], t)
+            pos += 1
+
+
+PROFILES = [
+    ("fast", fast_typist),
+    ("error-prone", error_prone_typist),
+    ("paste-heavy", paste_heavy_typist),
+]
+
+
+def replay(session, events):
+    for kind, payload, t in events:
+        if kind == "char":
+            session.type_char(payload, t)
+        elif kind == "backspace":
+            session.backspace(t)
+        else:
+            session.paste(payload, t)
+    return session.finish()
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    texts = load_texts_from_files()
+    # Generate the streams up front so only the replay is measured
+    for name, profile in PROFILES:
+        rng = random.Random(name)
+        streams = [list(profile(texts[i % len(texts)], rng)) for i in range(rounds)]
+        keystrokes = sum(len(events) for events in streams)
+
+        # Throughput with tracemalloc off (tracing slows every allocation
+        # down many times over), then peak memory in a second pass
+        session = TypingSession(time_limit=3600)  # Measure whole passages
+        start = time.perf_counter()
+        for i, events in enumerate(streams):
+            session.load(texts[i % len(texts)])
+            results = replay(session, events)
+        elapsed = time.perf_counter() - start
+
+        session = TypingSession(time_limit=3600)
+        tracemalloc.start()
+        for i, events in enumerate(streams):
+            session.load(texts[i % len(texts)])
+            replay(session, events)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        print(
+            f"{name:<12} {keystrokes / elapsed:>12,.0f} keys/s  "
+            f"peak {peak / 1024:7.1f} KiB  "
+            f"last round: {results.net_wpm} net WPM, {results.word_accuracy:.1f}% words"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+# Time-to-first-window for each way of launching the app.
+#
+#   python benchmarks/bench_startup.py [--runs 10] [--build]
+#
+# Launches every variant found (from source, from source with -OO, and
+# each PyInstaller build under dist/) several times in a scratch directory.
+# The app is started in benchmark mode (TYPINGTEST_FIRST_WINDOW_FILE), so it
+# writes the wall-clock time of its first paint and quits; the time from
+# spawning the process to that paint is what a user waits for. --build runs
+# PyInstaller on every spec first. Needs a display (xvfb-run on a headless
+# box).
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EXE = ".exe" if sys.platform == "win32" else ""
+
+# (name, spec, path of the built executable)
+BUILDS = [
+    ("app.spec", "app.spec", os.path.join("dist", "app", "app" + EXE)),
+    ("typing_test.spec (onefile)", "typing_test.spec", os.path.join("dist", "Typing Test" + EXE)),
+    ("typing_test_fast.spec", "typing_test_fast.spec", os.path.join("dist", "typing_test_fast", "typing_test_fast" + EXE)),
+]
+
+
+def variants(skip=()):
+    app = os.path.join(ROOT, "app.py")
+    found = [
+        ("source", [sys.executable, app]),
+        ("source -OO", [sys.executable, "-OO", app]),
+    ]
+    for name, _, path in BUILDS:
+        path = os.path.join(ROOT, path)
+        if name not in skip and os.path.exists(path):
+            found.append((name, [path]))
+    return found
+
+
+def build():
+    # A spec that fails to build (e.g. data files missing from the tree) is
+    # skipped, rather than timing a stale build of it; the others are still
+    # built and timed. Returns the names of the failed builds.
+    failed = set()
+    for name, spec, _ in BUILDS:
+        print(f"Building {name}...", flush=True)
+        try:
+            subprocess.run(
+                [sys.executable, "-m", "PyInstaller", "--noconfirm", spec],
+                cwd=ROOT, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            )
+        except subprocess.CalledProcessError as e:
+            print(f"{name:<28} skipped, PyInstaller exited with status {e.returncode}")
+            failed.add(name)
+        except OSError as e:
+            print(f"{name:<28} skipped, build failed: {e}")
+            failed.add(name)
+    return failed
+
+
+def launch(command, workdir, timeout):
+    # (seconds to first window, seconds to exit) for one launch
+    marker = os.path.join(workdir, "first-window.txt")
+    if os.path.exists(marker):
+        os.remove(marker)
+    env = dict(os.environ, TYPINGTEST_FIRST_WINDOW_FILE=marker, TYPINGTEST_SOUND="0")
+    started = time.time()
+    subprocess.run(
+        command, cwd=workdir, env=env, timeout=timeout, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    exited = time.time()
+    with open(marker) as f:
+        painted = float(f.read())
+    return painted - started, exited - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure time-to-first-window of each build variant")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--build", action="store_true", help="run PyInstaller on every spec first")
+    parser.add_argument("--timeout", type=float, default=60)
+    args = parser.parse_args()
+
+    skip = build() if args.build else set()
+
+    print(f"{'variant':<28} {'first window (ms)':>34}   {'exit (ms)':>9}")
+    print(f"{'':<28} {'min':>10} {'median':>11} {'max':>11}   {'median':>9}")
+    for name, command in variants(skip):
+        workdir = tempfile.mkdtemp()
+        try:
+            # One unmeasured launch so every variant starts with a warm disk
+            # cache, then the measured ones
+            launch(command, workdir, args.timeout)
+            times = [launch(command, workdir, args.timeout) for _ in range(args.runs)]
+        except (OSError, subprocess.SubprocessError, ValueError) as e:
+            print(f"{name:<28} failed: {e}")
+            continue
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+        first = [t[0] * 1000 for t in times]
+        total = [t[1] * 1000 for t in times]
+        print(
+            f"{name:<28} {min(first):10.0f} {statistics.median(first):11.0f} {max(first):11.0f}"
+            f"   {statistics.median(total):9.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+# Round-end burst against a local results collector.
+#
+#   python benchmarks/load_collector.py [stations]
+#
+# Starts a collector on localhost with a throwaway database, then has
+# `stations` clients (default 400) connect and submit a round result at the
+# same instant, reporting per-station ack latency and total throughput. A
+# second phase starts threaded CollectorClients before the collector is up
+# to check that they buffer, retry and deliver once it appears.
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sqlite3
+
+from collector import CollectorClient, ResultCollector
+
+RETRY_CLIENTS = 20
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def station(port, number, go, latencies):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    await go.wait()
+    start = time.perf_counter()
+    message = {
+        "id": f"burst-{number}",
+        "station": f"seat-{number}",
+        "row": [f"student{number}", 1, 60, 55, 92.5, 3.1, time.time()],
+        "keylog": None,
+    }
+    writer.write(json.dumps(message).encode() + b"\n")
+    await writer.drain()
+    reply = json.loads(await reader.readline())
+    latencies.append(time.perf_counter() - start)
+    writer.close()
+    return reply["ok"]
+
+
+async def burst(db_name, stations):
+    collector = ResultCollector(db_name, port=0)
+    await collector.start()
+    go = asyncio.Event()
+    latencies = []
+    tasks = [asyncio.create_task(station(collector.port, n, go, latencies)) for n in range(stations)]
+    await asyncio.sleep(0.2)  # Let every station connect first
+
+    start = time.perf_counter()
+    go.set()
+    results = await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+    await collector.stop()
+
+    print(f"burst: {stations} stations, {sum(results)} acked in {elapsed * 1000:.0f} ms "
+          f"({stations / elapsed:,.0f} results/s)")
+    print(f"  ack latency p50 {percentile(latencies, 0.5) * 1000:.1f} ms, "
+          f"p99 {percentile(latencies, 0.99) * 1000:.1f} ms, "
+          f"max {max(latencies) * 1000:.1f} ms")
+
+
+def retry(db_name):
+    # Pick a free port for the collector that is not running yet
+    import socket
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+
+    clients = [CollectorClient("127.0.0.1", port, station=f"retry-{n}") for n in range(RETRY_CLIENTS)]
+    for n, client in enumerate(clients):
+        client.submit([f"late{n}", 2, 70, 66, 95.0, 1.2, time.time()])
+    time.sleep(1.0)  # Every client fails at least once
+
+    loop = asyncio.new_event_loop()
+    collector = ResultCollector(db_name, port=port)
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    asyncio.run_coroutine_threadsafe(collector.start(), loop).result()
+
+    start = time.perf_counter()
+    while any(client.pending for client in clients) and time.perf_counter() - start < 40:
+        time.sleep(0.05)
+    delivered = sum(1 for client in clients if not client.pending)
+    for client in clients:
+        client.close()
+    asyncio.run_coroutine_threadsafe(collector.stop(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+    print(f"retry: {delivered}/{RETRY_CLIENTS} buffered results delivered "
+          f"{time.perf_counter() - start:.1f}s after the collector came up")
+
+
+def main():
+    stations = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    with tempfile.TemporaryDirectory() as tmp:
+        db_name = os.path.join(tmp, "central.db")
+        asyncio.run(burst(db_name, stations))
+        retry(db_name)
+        conn = sqlite3.connect(db_name)
+        rows = conn.execute("SELECT COUNT(*) FROM typing_results").fetchone()[0]
+        conn.close()
+        print(f"central store holds {rows} rows (expected {stations + RETRY_CLIENTS})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,357 @@
+import argparse
+import asyncio
+import base64
+import hmac
+import json
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import storage
+
+# Multi-station lab mode.
+#
+# One machine runs the collector:
+#
+#   python collector.py --host 0.0.0.0 --port 8765 --db lab_results.db --token SECRET
+#
+# and every station is started with --collector HOST:PORT (or
+# TYPINGTEST_COLLECTOR=HOST:PORT) and TYPINGTEST_COLLECTOR_TOKEN=SECRET.
+# Stations still keep their local database; each round result is also
+# streamed to the collector, which writes all stations' results into one
+# central store.
+#
+# The collector listens on localhost only unless given --host, and then
+# needs a shared token (--token or TYPINGTEST_COLLECTOR_TOKEN), so other
+# machines on the network cannot insert results.
+#
+# The wire format is one JSON object per line. A submission is
+#   {"id": ..., "station": ..., "token": ..., "row": [...], "keylog": base64 or null}
+# and is acknowledged with {"id": ..., "ok": true} once it is committed. A
+# rejection is {"id": ..., "ok": false, "error": ..., "retry": bool}: retry
+# is true only for transient failures (a busy or failing disk); anything
+# else (a bad token, a malformed or unstorable row) will never succeed, so
+# the station drops it and keeps it only in its local database.
+# Submission ids are recorded centrally, so a retry after a lost ack is
+# not inserted twice.
+
+DEFAULT_PORT = 8765
+
+# Largest batch committed in one transaction, and how long the writer
+# lets a batch fill once the first submission has arrived
+BATCH_SIZE = 500
+BATCH_DELAY = 0.02
+
+
+def create_collector_schema(conn):
+    storage.create_schema(conn)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS collected_submissions (
+            submission_id TEXT PRIMARY KEY,
+            station TEXT,
+            result_id INTEGER
+        )
+    ''')
+    conn.commit()
+
+
+class ResultCollector:
+    # asyncio server that batches submissions from many stations into one
+    # SQLite database. Connections only parse and enqueue; one writer task
+    # commits batches on a dedicated thread so the event loop never blocks
+    # on disk and no station waits on another's connection.
+
+    def __init__(self, db_name, host="127.0.0.1", port=DEFAULT_PORT, token=None):
+        self.db_name = db_name
+        self.host = host
+        self.port = port
+        self.token = token
+        self.received = 0
+        self.written = 0
+        self._queue = None
+        self._server = None
+        self._writer_task = None
+        self._acks = set()  # Pending ack tasks, referenced until they finish
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._conn = None
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, self._connect)
+        self._queue = asyncio.Queue()
+        self._writer_task = asyncio.create_task(self._write_loop())
+        self._server = await asyncio.start_server(self._handle, self.host, self.port, backlog=1024)
+        # Port 0 picks a free port; report the real one
+        self.port = self._server.sockets[0].getsockname()[1]
+        print(f"Collector listening on {self.host}:{self.port}, writing to {self.db_name}")
+
+    async def serve_forever(self):
+        await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+        await self._queue.join()
+        self._writer_task.cancel()
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, self._conn.close)
+        self._executor.shutdown()
+
+    def _connect(self):
+        self._conn = storage.connect(self.db_name)
+        create_collector_schema(self._conn)
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                message = None
+                try:
+                    message = json.loads(line)
+                    if self.token and not hmac.compare_digest(str(message.get("token", "")), self.token):
+                        raise ValueError("invalid collector token")
+                    submission = (
+                        str(message["id"]),
+                        str(message.get("station", "")),
+                        tuple(message["row"]),
+                        base64.b64decode(message["keylog"]) if message.get("keylog") else None,
+                    )
+                except (ValueError, KeyError, TypeError) as e:
+                    submission_id = message.get("id") if isinstance(message, dict) else None
+                    self._reply(writer, submission_id, (False, str(e), False))
+                    continue
+                self.received += 1
+                done = asyncio.get_running_loop().create_future()
+                await self._queue.put((submission, done))
+                ack = asyncio.ensure_future(self._ack(writer, submission[0], done))
+                self._acks.add(ack)
+                ack.add_done_callback(self._acks.discard)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _ack(self, writer, submission_id, done):
+        self._reply(writer, submission_id, await done)
+
+    @staticmethod
+    def _reply(writer, submission_id, outcome):
+        ok, error, retry = outcome
+        if writer.is_closing():
+            return
+        reply = {"id": submission_id, "ok": ok}
+        if not ok:
+            reply["error"] = error
+            reply["retry"] = retry
+        writer.write(json.dumps(reply).encode() + b"\n")
+
+    async def _write_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            # Let the rest of a round-end burst arrive, then take it all
+            await asyncio.sleep(BATCH_DELAY)
+            while len(batch) < BATCH_SIZE and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            outcomes = await loop.run_in_executor(
+                self._executor, self._write_batch, [submission for submission, _ in batch]
+            )
+            for (_, done), outcome in zip(batch, outcomes):
+                done.set_result(outcome)
+                self._queue.task_done()
+
+    def _write_batch(self, submissions):
+        # One (ok, error, retry) per submission. The batch is one
+        # transaction; if it fails, the rows are written one at a time so
+        # only the row at fault is rejected.
+        try:
+            self._write_rows(submissions)
+            return [(True, None, False)] * len(submissions)
+        except Exception as e:
+            if len(submissions) > 1:
+                return [self._write_batch([submission])[0] for submission in submissions]
+            # Locked or failing disks recover; bad rows never will
+            transient = isinstance(e, sqlite3.OperationalError)
+            print(f"Collector could not store submission {submissions[0][0]}: {e}")
+            return [(False, str(e), transient)]
+
+    def _write_rows(self, submissions):
+        conn = self._conn
+        inserted = 0
+        with conn:
+            for submission_id, station, row, keylog_blob in submissions:
+                cursor = conn.execute(
+                    'INSERT OR IGNORE INTO collected_submissions (submission_id, station) VALUES (?, ?)',
+                    (submission_id, station)
+                )
+                if cursor.rowcount == 0:
+                    continue  # Retried after a lost ack; already stored
+                result_id = storage.insert_result(conn, row, keylog_blob)
+                inserted += 1
+                conn.execute(
+                    'UPDATE collected_submissions SET result_id = ? WHERE submission_id = ?',
+                    (result_id, submission_id)
+                )
+        # Only rows actually stored, not retries of stored ones
+        self.written += inserted
+
+
+class CollectorClient:
+    # Station side. submit() only appends to an in-memory buffer; a
+    # background thread sends everything buffered, waits for the acks and
+    # keeps retrying with backoff while the collector is unreachable. A
+    # result the collector rejects for good is dropped from the buffer; it
+    # is still in the station's own database.
+
+    def __init__(self, host, port=DEFAULT_PORT, station=None, timeout=5, token=None):
+        self.host = host
+        self.port = port
+        self.station = station or socket.gethostname()
+        self.token = token if token is not None else os.environ.get("TYPINGTEST_COLLECTOR_TOKEN")
+        self.timeout = timeout
+        self._pending = deque()
+        self._condition = threading.Condition()
+        self._closing = False
+        self._sock = None
+        self._thread = threading.Thread(target=self._run, name="collector-client")
+        self._thread.daemon = True
+        self._thread.start()
+
+    @property
+    def pending(self):
+        return len(self._pending)
+
+    def submit(self, row, keylog=None):
+        with self._condition:
+            self._pending.append((uuid.uuid4().hex, tuple(row), keylog))
+            self._condition.notify()
+
+    def close(self, timeout=2):
+        # Give buffered results a last chance to go out, then stop
+        with self._condition:
+            self._closing = True
+            self._condition.notify()
+        self._thread.join(timeout)
+        if self._pending:
+            print(f"Collector unreachable, {len(self._pending)} result(s) kept only locally")
+
+    def _run(self):
+        backoff = 0.5
+        while True:
+            with self._condition:
+                while not self._pending and not self._closing:
+                    self._condition.wait()
+                if not self._pending:
+                    break
+                batch = list(self._pending)
+            try:
+                done = self._send(batch)
+                backoff = 0.5
+            except (OSError, ValueError) as e:
+                self._disconnect()
+                if self._closing:
+                    break
+                print(f"Collector unavailable ({e}), retrying in {backoff:.1f}s")
+                with self._condition:
+                    self._condition.wait(backoff)
+                backoff = min(backoff * 2, 30)
+                continue
+            with self._condition:
+                self._pending = deque(item for item in self._pending if item[0] not in done)
+        self._disconnect()
+
+    def _send(self, batch):
+        if self._sock is None:
+            self._sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+            self._reader = self._sock.makefile("rb")
+        lines = []
+        for submission_id, row, keylog in batch:
+            blob = keylog.to_blob() if keylog is not None else None
+            lines.append(json.dumps({
+                "id": submission_id,
+                "station": self.station,
+                "token": self.token,
+                "row": row,
+                "keylog": base64.b64encode(blob).decode("ascii") if blob else None,
+            }).encode() + b"\n")
+        self._sock.sendall(b"".join(lines))
+
+        # Ids of the results that need no resend, stored or rejected for good
+        done = set()
+        for _ in batch:
+            line = self._reader.readline()
+            if not line:
+                raise ConnectionError("collector closed the connection")
+            reply = json.loads(line)
+            if reply.get("ok"):
+                done.add(reply["id"])
+            elif reply.get("retry"):
+                raise ValueError(reply.get("error", "collector could not store the result"))
+            else:
+                print(f"Collector rejected result {reply.get('id')}: {reply.get('error')}; kept only locally")
+                done.add(reply.get("id"))
+        return done
+
+    def _disconnect(self):
+        if self._sock is not None:
+            try:
+                self._reader.close()
+                self._sock.close()
+            except OSError:
+                pass
+            self._sock = None
+
+
+def address_from_argv(argv=None):
+    # (host, port) from --collector HOST:PORT or TYPINGTEST_COLLECTOR, or None
+    argv = sys.argv if argv is None else argv
+    address = os.environ.get("TYPINGTEST_COLLECTOR")
+    if "--collector" in argv:
+        position = argv.index("--collector")
+        if position + 1 < len(argv):
+            address = argv[position + 1]
+    if not address:
+        return None
+    host, _, port = address.rpartition(":")
+    if not host:
+        return address, DEFAULT_PORT
+    try:
+        return host, int(port)
+    except ValueError:
+        print(f"Invalid collector address {address!r}, keeping results locally only")
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Central results collector for lab mode")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--db", default="lab_results.db")
+    parser.add_argument(
+        "--token",
+        default=os.environ.get("TYPINGTEST_COLLECTOR_TOKEN"),
+        help="shared token stations must send (default: TYPINGTEST_COLLECTOR_TOKEN)"
+    )
+    args = parser.parse_args(argv)
+    if args.host not in ("127.0.0.1", "localhost", "::1") and not args.token:
+        parser.error("listening beyond localhost needs --token or TYPINGTEST_COLLECTOR_TOKEN")
+
+    collector = ResultCollector(args.db, args.host, args.port, args.token)
+    try:
+        asyncio.run(collector.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    print(f"Collector stopped after storing {collector.written} result(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+import mmap
+import random
+import struct
+import sys
+from array import array
+
+# Passage corpus file, read through mmap.
+#
+#   header | passage data (UTF-8) | index records | ids by length | ids by difficulty
+#
+# Every index record is fixed size, so passage N is one unpack and one slice
+# away. The two id lists are sorted by character length and by difficulty,
+# so filtering on either is a binary search instead of a scan.
+#
+# Build one from a text file with one passage per line:
+#
+#   python corpus.py build passages.txt passages.corpus
+
+MAGIC = b"TTCORP01"
+_HEADER = struct.Struct("<8sIQQQ")  # magic, count, index, by length, by difficulty
+_RECORD = struct.Struct("<QIIHBx")  # data offset, bytes, chars, words, difficulty
+
+DEFAULT_CORPUS = "passages.corpus"
+
+
+def passage_difficulty(text):
+    # 0 (short common words) .. 255 (long words, lots of punctuation and caps)
+    words = text.split()
+    if not words:
+        return 0
+    avg_word = sum(len(word) for word in words) / len(words)
+    unusual = sum(1 for char in text if not (char.islower() or char.isspace())) / len(text)
+    return max(0, min(255, int((avg_word - 3) * 40 + unusual * 600)))
+
+
+def build_corpus(passages, path):
+    records = array('B')
+    lengths = array('I')
+    difficulties = array('B')
+    count = 0
+    with open(path, "wb") as f:
+        f.write(b"\0" * _HEADER.size)
+        for text in passages:
+            data = text.encode("utf-8")
+            difficulty = passage_difficulty(text)
+            records.frombytes(_RECORD.pack(
+                f.tell(), len(data), len(text), min(len(text.split()), 0xFFFF), difficulty
+            ))
+            lengths.append(len(text))
+            difficulties.append(difficulty)
+            f.write(data)
+            count += 1
+
+        index_offset = f.tell()
+        f.write(records.tobytes())
+
+        by_length = _id_array(sorted(range(count), key=lengths.__getitem__))
+        by_difficulty = _id_array(sorted(range(count), key=difficulties.__getitem__))
+        by_length_offset = f.tell()
+        f.write(by_length.tobytes())
+        by_difficulty_offset = f.tell()
+        f.write(by_difficulty.tobytes())
+
+        f.seek(0)
+        f.write(_HEADER.pack(MAGIC, count, index_offset, by_length_offset, by_difficulty_offset))
+    return count
+
+
+def _id_array(ids):
+    ids = array('I', ids)
+    if sys.byteorder == "big":
+        ids.byteswap()
+    return ids
+
+
+class Corpus:
+    def __init__(self, path=DEFAULT_CORPUS):
+        self._file = open(path, "rb")
+        self._map = None
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, self.count, self._index, self._by_length, self._by_difficulty = _HEADER.unpack_from(self._map)
+            if magic != MAGIC:
+                raise ValueError("bad magic number")
+            # A truncated file would otherwise fail on the first lookup
+            size = len(self._map)
+            if (self._index + self.count * _RECORD.size > size
+                    or self._by_length + self.count * 4 > size
+                    or self._by_difficulty + self.count * 4 > size):
+                raise ValueError("file is truncated")
+        except (ValueError, struct.error) as e:
+            # mmap raises ValueError for an empty file
+            self.close()
+            raise ValueError(f"{path} is not a valid passage corpus: {e}") from e
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _record(self, n):
+        if not 0 <= n < self.count:
+            raise IndexError(n)
+        return _RECORD.unpack_from(self._map, self._index + n * _RECORD.size)
+
+    def passage(self, n):
+        offset, size, _, _, _ = self._record(n)
+        return self._map[offset:offset + size].decode("utf-8")
+
+    def length(self, n):
+        return self._record(n)[2]
+
+    def words(self, n):
+        return self._record(n)[3]
+
+    def difficulty(self, n):
+        return self._record(n)[4]
+
+    def _sorted_id(self, table, position):
+        return struct.unpack_from("<I", self._map, table + position * 4)[0]
+
+    def _bisect(self, table, key, value):
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if key(self._sorted_id(table, mid)) < value:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def select(self, min_length=None, max_length=None, min_difficulty=None, max_difficulty=None):
+        # Passages with length/difficulty in the given inclusive bounds, as a
+        # PassageSelection over one of the sorted id lists. Bounding both
+        # takes the length range and checks difficulty per sampled passage.
+        if min_length is not None or max_length is not None:
+            table, key = self._by_length, self.length
+            low, high = min_length, max_length
+        else:
+            table, key = self._by_difficulty, self.difficulty
+            low, high = min_difficulty, max_difficulty
+            min_difficulty = max_difficulty = None
+        start = self._bisect(table, key, low) if low is not None else 0
+        stop = self._bisect(table, key, high + 1) if high is not None else self.count
+
+        check = None
+        if min_difficulty is not None or max_difficulty is not None:
+            low_d = min_difficulty if min_difficulty is not None else 0
+            high_d = max_difficulty if max_difficulty is not None else 255
+            check = lambda n: low_d <= self.difficulty(n) <= high_d
+        return PassageSelection(self, table, start, stop, check)
+
+    def sampler(self, seed=None, **bounds):
+        return self.select(**bounds).sampler(seed)
+
+
+class PassageSelection:
+    def __init__(self, corpus, table, start, stop, check=None):
+        self.corpus = corpus
+        self.table = table
+        self.start = start
+        self.stop = stop
+        self.check = check
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def id_at(self, position):
+        return self.corpus._sorted_id(self.table, self.start + position)
+
+    def sampler(self, seed=None):
+        return PassageSampler(self, seed)
+
+
+class PassageSampler:
+    # Draws passage ids from a selection in random order without repeats.
+    # A lazy Fisher-Yates shuffle: only the swapped positions are remembered,
+    # so each draw is O(1) and memory grows with draws, not corpus size.
+
+    def __init__(self, selection, seed=None):
+        self.selection = selection
+        self.random = random.Random(seed)
+        self._remaining = len(selection)
+        self._swaps = {}
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        while self._remaining > 0:
+            self._remaining -= 1
+            pick = self.random.randint(0, self._remaining)
+            last = self._remaining
+            position = self._swaps.get(pick, pick)
+            self._swaps[pick] = self._swaps.pop(last, last)
+            passage_id = self.selection.id_at(position)
+            if self.selection.check is None or self.selection.check(passage_id):
+                return passage_id
+        raise StopIteration
+
+    def take(self, count):
+        ids = []
+        for passage_id in self:
+            ids.append(passage_id)
+            if len(ids) == count:
+                break
+        return ids
+
+
+def main(argv):
+    if len(argv) != 4 or argv[1] != "build":
+        print("usage: python corpus.py build passages.txt passages.corpus")
+        return 2
+    with open(argv[2], encoding="utf-8") as f:
+        count = build_corpus((line.strip() for line in f if line.strip()), argv[3])
+    print(f"Wrote {count} passages to {argv[3]}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
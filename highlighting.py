@@ -0,0 +1,181 @@
+import tkinter as tk
+
+# Per-character states kept for the rendered prompt
+UNTYPED = 0
+CORRECT = 1
+INCORRECT = 2
+
+TAG_NAMES = {CORRECT: "correct", INCORRECT: "incorrect"}
+
+# Underlines the word being typed
+CURRENT_WORD = "current_word"
+
+# Passages longer than this are rendered through a sliding window of about
+# this many characters around the caret
+WINDOW_CHARS = 4000
+
+
+class PromptHighlighter:
+    # Keeps the prompt Text widget in sync with what has been typed.
+    # The passage is inserted once per round; after that only the characters
+    # whose state changed since the last render get their tags touched, and
+    # consecutive characters with the same state are tagged as one run.
+    #
+    # Long passages are virtualized: the widget only holds a window of the
+    # passage around the caret, cut at word boundaries, and the window slides
+    # forward (or back, on backspace) as the caret nears either edge. Tags are
+    # tracked for the whole passage, so text scrolled back in comes with its
+    # highlighting. Keeping the widget small keeps Tk layout and index
+    # arithmetic flat however long the passage is.
+
+    def __init__(self, widget, window_chars=WINDOW_CHARS):
+        self.widget = widget
+        self.window_chars = window_chars
+        self.text = ""
+        self._state = bytearray()
+        self._win_start = 0
+        self._win_end = 0
+        self._word = (0, 0)
+
+    def load(self, text, word=None):
+        # Insert a fresh passage with no highlighting, and the (start, end)
+        # span word (the first word) underlined
+        self.text = text
+        self._state = bytearray(len(text))
+        self._win_start = 0
+        self._win_end = self._word_end(min(len(text), self.window_chars))
+        self._word = (0, 0)
+
+        self.widget.config(state='normal')
+        self.widget.delete("1.0", tk.END)
+        self.widget.insert(tk.END, text[:self._win_end])
+        if word is not None:
+            self._underline(word)
+        self.widget.config(state='disabled')
+        self.widget.see("1.0")
+
+    def show(self, states, start, end, caret, word=None):
+        # Render per-character states computed elsewhere (an alignment) for
+        # passage positions start..end, with the caret at passage offset
+        # caret and the (start, end) span word underlined
+        self.widget.config(state='normal')
+        if start < end:
+            self._apply(start, states[start:end])
+        window = (self._win_start, self._win_end)
+        self._follow_caret(min(caret, len(self.text)))
+        if word is not None and (word != self._word or window != (self._win_start, self._win_end)):
+            self._underline(word)
+        self.widget.config(state='disabled')
+
+    def _underline(self, word):
+        # One tagged range at most, so clearing the whole widget is cheap;
+        # after a slide this also tags the word if it just scrolled in
+        self._word = word
+        self.widget.tag_remove(CURRENT_WORD, "1.0", tk.END)
+        start = max(word[0], self._win_start)
+        end = min(word[1], self._win_end)
+        if start < end:
+            self.widget.tag_add(CURRENT_WORD, self._index(start), self._index(end))
+
+    def _apply(self, start, new_state):
+        # Diff against the rendered state and retag only the changed runs
+        old_state = self._state
+        i = 0
+        n = len(new_state)
+        while i < n:
+            value = new_state[i]
+            if old_state[start + i] == value:
+                i += 1
+                continue
+            run_start = i
+            stale = set()
+            while i < n and new_state[i] == value and old_state[start + i] != value:
+                stale.add(old_state[start + i])
+                i += 1
+            self._retag(start + run_start, start + i, value, stale)
+        old_state[start:start + n] = new_state
+
+    def _retag(self, start, end, value, stale):
+        # Characters outside the window only change state; they are tagged
+        # when they scroll in
+        start = max(start, self._win_start)
+        end = min(end, self._win_end)
+        if start >= end:
+            return
+        first = self._index(start)
+        last = self._index(end)
+        for state in stale:
+            if state in TAG_NAMES:
+                self.widget.tag_remove(TAG_NAMES[state], first, last)
+        if value in TAG_NAMES:
+            self.widget.tag_add(TAG_NAMES[value], first, last)
+
+    def _index(self, offset):
+        return f"1.0+{offset - self._win_start}c"
+
+    def _follow_caret(self, caret):
+        margin = self.window_chars // 4
+        near_end = caret > self._win_end - margin and self._win_end < len(self.text)
+        near_start = caret < self._win_start + margin and self._win_start > 0
+        if near_end or near_start:
+            # Re-centre so the caret sits a third of the way into the window
+            new_start = self._word_start(max(0, caret - self.window_chars // 3))
+            new_end = self._word_end(min(len(self.text), new_start + self.window_chars))
+            self._slide(new_start, new_end)
+        self.widget.see(self._index(caret))
+
+    def _slide(self, new_start, new_end):
+        widget = self.widget
+        if new_start >= self._win_end or new_end <= self._win_start:
+            # No overlap (e.g. a paste jumped far ahead): refill the window
+            widget.delete("1.0", tk.END)
+            self._insert(tk.END, new_start, new_end)
+            self._win_start = new_start
+            self._win_end = new_end
+            return
+
+        if new_start > self._win_start:
+            widget.delete("1.0", self._index(new_start))
+        elif new_start < self._win_start:
+            self._insert("1.0", new_start, self._win_start)
+        self._win_start = new_start
+
+        if new_end < self._win_end:
+            widget.delete(self._index(new_end), "end-1c")
+        elif new_end > self._win_end:
+            self._insert("end-1c", self._win_end, new_end)
+        self._win_end = new_end
+
+    def _insert(self, index, start, end):
+        # Insert passage[start:end] with its tags, one (chars, tags) pair per
+        # run of equal state, in a single Text.insert call
+        if start < end:
+            self.widget.insert(index, *self._runs(start, end))
+
+    def _runs(self, start, end):
+        state = self._state
+        text = self.text
+        args = []
+        i = start
+        while i < end:
+            value = state[i]
+            j = i + 1
+            while j < end and state[j] == value:
+                j += 1
+            args.append(text[i:j])
+            args.append((TAG_NAMES[value],) if value in TAG_NAMES else ())
+            i = j
+        return args
+
+    def _word_start(self, pos):
+        # Move back to the start of the word containing pos
+        while 0 < pos < len(self.text) and not self.text[pos - 1].isspace():
+            pos -= 1
+        return pos
+
+    def _word_end(self, pos):
+        # Move forward past the end of the word containing pos
+        text = self.text
+        while 0 < pos < len(text) and not text[pos - 1].isspace():
+            pos += 1
+        return pos
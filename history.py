@@ -0,0 +1,138 @@
+import time
+import tkinter as tk
+
+# Rows shown at once, rows fetched per query, and how close to the end of
+# what has been loaded the view may get before the next page is fetched
+VISIBLE_ROWS = 10
+PAGE_SIZE = 50
+PREFETCH_ROWS = 20
+
+# How often the Tk loop checks whether a fetch has come back
+POLL_MS = 20
+
+
+def when_fetched(widget, reads, callback):
+    # Polls from the Tk loop until every PendingRead is done, then calls
+    # back with their results, unless the widget has gone in the meantime
+    if not widget.winfo_exists():
+        return
+    if not all(read.done.is_set() for read in reads):
+        widget.after(POLL_MS, when_fetched, widget, reads, callback)
+        return
+    callback(*[read.result for read in reads])
+
+
+class HistoryBrowser(tk.Frame):
+    # A user's past rounds, newest first, read from the store a page at a
+    # time as the view scrolls down. The view is a fixed pool of row labels
+    # whose text is swapped on scroll, so opening it costs the same however
+    # many rounds a user has. Pages are fetched on the store's worker and
+    # shown when they arrive; the view never waits on the database.
+
+    def __init__(self, parent, store, user_name, visible_rows=VISIBLE_ROWS, page_size=PAGE_SIZE, **kwargs):
+        super().__init__(parent, bg="#34495E", **kwargs)
+        self.store = store
+        self.user_name = user_name
+        self.visible_rows = visible_rows
+        self.page_size = page_size
+        self.rows = []  # Loaded so far, in display order
+        self.exhausted = False
+        self.loading = False  # A page fetch is in flight
+        self.first = 0  # Index of the top visible row
+        self.wanted = 0  # Where the view should be once enough is loaded
+
+        header = tk.Label(
+            self,
+            text=self._format_header(),
+            font=("Courier", 12, "bold"),
+            bg="#34495E",
+            fg="#3498DB",
+            anchor="w"
+        )
+        header.grid(row=0, column=0, sticky="we")
+
+        self.scrollbar = tk.Scrollbar(self, orient="vertical", command=self.on_scrollbar)
+        self.scrollbar.grid(row=1, column=1, rowspan=visible_rows, sticky="ns")
+        self.labels = []
+        for i in range(visible_rows):
+            label = tk.Label(self, font=("Courier", 12), bg="#34495E", fg="#ECF0F1", anchor="w")
+            label.grid(row=i + 1, column=0, sticky="we")
+            self.labels.append(label)
+        self.grid_columnconfigure(0, weight=1)
+
+        # Wheel events over the browser scroll it rather than the page
+        for widget in [self, header] + self.labels:
+            widget.bind("<MouseWheel>", self._on_mousewheel)
+            widget.bind("<Button-4>", lambda event: self.scroll_to(self.first - 1))
+            widget.bind("<Button-5>", lambda event: self.scroll_to(self.first + 1))
+
+        self.scroll_to(0)
+
+    def load_more(self):
+        # Fetch the next page, seeking from the last row loaded
+        if self.exhausted or self.loading:
+            return
+        before = None
+        if self.rows:
+            last = self.rows[-1]
+            before = (last[7], last[0])
+        self.loading = True
+        read = self.store.fetch("history", self.user_name, self.page_size, before)
+        when_fetched(self, [read], self.on_page)
+
+    def on_page(self, page):
+        self.loading = False
+        if page is None:  # The query failed; show what there is
+            page = []
+        self.rows.extend(page)
+        if len(page) < self.page_size:
+            self.exhausted = True
+        self.scroll_to(self.wanted)
+
+    def scroll_to(self, first):
+        self.wanted = max(0, first)
+        if not self.exhausted and first + self.visible_rows + PREFETCH_ROWS > len(self.rows):
+            self.load_more()
+        self.first = max(0, min(first, len(self.rows) - self.visible_rows))
+        self.refresh()
+
+    def refresh(self):
+        for i, label in enumerate(self.labels):
+            index = self.first + i
+            if index < len(self.rows):
+                label.config(text=self._format_row(self.rows[index]))
+            elif index == 0:
+                label.config(text="No rounds recorded yet" if self.exhausted else "Loading...")
+            else:
+                label.config(text="")
+        # Until the last page is in, the scrollbar shows what is loaded plus
+        # one more page
+        total = len(self.rows) if self.exhausted else len(self.rows) + self.page_size
+        total = max(total, 1)
+        self.scrollbar.set(self.first / total, min(1.0, (self.first + self.visible_rows) / total))
+
+    def on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            total = len(self.rows) if self.exhausted else len(self.rows) + self.page_size
+            self.scroll_to(int(float(amount) * total))
+        elif unit == "pages":
+            self.scroll_to(self.first + int(amount) * self.visible_rows)
+        else:
+            self.scroll_to(self.first + int(amount))
+
+    def _on_mousewheel(self, event):
+        self.scroll_to(self.first - event.delta // 120)
+        return "break"
+
+    @staticmethod
+    def _format_header():
+        return f"{'Date':<17} {'Round':>5} {'Net':>5} {'Gross':>5} {'Words':>7} {'Errors':>7}"
+
+    @staticmethod
+    def _format_row(row):
+        _, _, round_number, gross_wpm, net_wpm, accuracy, error_rate, timestamp = row
+        when = time.strftime("%Y-%m-%d %H:%M", time.localtime(timestamp)) if timestamp else "-"
+        return (
+            f"{when:<17} {round_number:>5} {net_wpm:>5} {gross_wpm:>5} "
+            f"{accuracy:>6.1f}% {error_rate:>6.1f}%"
+        )
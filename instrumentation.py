@@ -0,0 +1,173 @@
+import json
+import os
+import sys
+import time
+import tkinter as tk
+from array import array
+from bisect import bisect_left
+
+# Per-keystroke latency instrumentation.
+#
+# Enable with --instrument (or TYPINGTEST_INSTRUMENT=1). Handler timings and
+# the delay from a key event to the next repaint go into fixed-bucket
+# histograms, so a session of any length uses the same memory. F12 toggles
+# an on-screen p50/p99 overlay, and the histograms are written as JSON on
+# exit (--latency-json PATH, default latency-<time>.json).
+
+# Bucket upper bounds in microseconds: 5us to ~20s, 12.5% apart
+BUCKET_BOUNDS_US = array('d')
+_bound = 5.0
+while _bound < 20e6:
+    BUCKET_BOUNDS_US.append(_bound)
+    _bound *= 1.125
+
+
+class LatencyHistogram:
+    __slots__ = ("counts", "count", "total_us", "max_us")
+
+    def __init__(self):
+        self.counts = array('Q', bytes(8 * (len(BUCKET_BOUNDS_US) + 1)))
+        self.count = 0
+        self.total_us = 0.0
+        self.max_us = 0.0
+
+    def add(self, micros):
+        self.counts[bisect_left(BUCKET_BOUNDS_US, micros)] += 1
+        self.count += 1
+        self.total_us += micros
+        if micros > self.max_us:
+            self.max_us = micros
+
+    def percentile(self, fraction):
+        # Upper bound of the bucket holding the given fraction of samples
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= target:
+                return BUCKET_BOUNDS_US[i] if i < len(BUCKET_BOUNDS_US) else self.max_us
+        return self.max_us
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "mean_us": self.total_us / self.count if self.count else 0.0,
+            "max_us": self.max_us,
+            "p50_us": self.percentile(0.5),
+            "p90_us": self.percentile(0.9),
+            "p99_us": self.percentile(0.99),
+            "bucket_bounds_us": list(BUCKET_BOUNDS_US),
+            "counts": list(self.counts),
+        }
+
+
+class Instrumentation:
+    def __init__(self, root, enabled=False, export_path=None):
+        self.root = root
+        self.enabled = enabled
+        self.export_path = export_path
+        self.histograms = {}
+        self.started = time.time()
+        self._pending_event = None
+        self._overlay = None
+        self._overlay_job = None
+        if enabled:
+            self.root.bind_all("<F12>", lambda event: self.toggle_overlay())
+
+    def histogram(self, name):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = LatencyHistogram()
+        return histogram
+
+    def wrap(self, name, handler):
+        # Returns handler unchanged when disabled, so there is no overhead
+        if not self.enabled:
+            return handler
+        histogram = self.histogram(name)
+        clock = time.perf_counter
+
+        def timed(*args, **kwargs):
+            start = clock()
+            try:
+                return handler(*args, **kwargs)
+            finally:
+                histogram.add((clock() - start) * 1e6)
+
+        return timed
+
+    def key_event(self, started=None):
+        # Call once a key has been handled, with the perf_counter time the
+        # key arrived (default: now). The idle callback queued here runs
+        # after Tk's own redisplay callbacks, i.e. once the frame that shows
+        # this key has been drawn.
+        if not self.enabled or self._pending_event is not None:
+            return
+        self._pending_event = started if started is not None else time.perf_counter()
+        self.root.after_idle(self._repainted)
+
+    def _repainted(self):
+        self.histogram("key_to_repaint").add((time.perf_counter() - self._pending_event) * 1e6)
+        self._pending_event = None
+
+    def toggle_overlay(self):
+        if self._overlay is not None:
+            self.root.after_cancel(self._overlay_job)
+            self._overlay.destroy()
+            self._overlay = None
+            return
+        self._overlay = tk.Label(
+            self.root,
+            font=("Courier", 10),
+            bg="#000000",
+            fg="#2ECC71",
+            justify=tk.LEFT,
+            anchor="ne"
+        )
+        self._overlay.place(relx=1.0, x=-10, y=10, anchor="ne")
+        self._refresh_overlay()
+
+    def _refresh_overlay(self):
+        lines = ["latency      p50      p99"]
+        for name, histogram in sorted(self.histograms.items()):
+            lines.append(
+                f"{name[:12]:<12} {histogram.percentile(0.5) / 1000:5.1f}ms {histogram.percentile(0.99) / 1000:5.1f}ms"
+            )
+        self._overlay.config(text="\n".join(lines))
+        self._overlay.lift()
+        self._overlay_job = self.root.after(500, self._refresh_overlay)
+
+    def to_dict(self):
+        return {
+            "session_started": self.started,
+            "exported": time.time(),
+            "histograms": {name: h.to_dict() for name, h in self.histograms.items()},
+        }
+
+    def export(self, path=None):
+        if not self.enabled:
+            return None
+        path = path or self.export_path or f"latency-{int(self.started)}.json"
+        try:
+            with open(path, "w") as f:
+                json.dump(self.to_dict(), f, indent=1)
+            print(f"Latency histograms written to {path}")
+        except OSError as e:
+            print(f"Error writing latency histograms: {e}")
+            return None
+        return path
+
+
+def options_from_argv(argv=None):
+    # (enabled, export path) from the command line and environment
+    argv = sys.argv if argv is None else argv
+    enabled = "--instrument" in argv or os.environ.get("TYPINGTEST_INSTRUMENT") == "1"
+    export_path = None
+    if "--latency-json" in argv:
+        position = argv.index("--latency-json")
+        if position + 1 < len(argv):
+            export_path = argv[position + 1]
+            enabled = True
+    return enabled, export_path
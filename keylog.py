@@ -0,0 +1,119 @@
+import math
+import struct
+import sys
+import zlib
+from array import array
+
+# Codepoint recorded for a deleted character
+BACKSPACE = 8
+
+BLOB_VERSION = 2
+_HEADER_V1 = struct.Struct("<BI")  # version, event count
+_HEADER = struct.Struct("<BId")  # version, event count, scored seconds (NaN if unknown)
+
+
+class KeystrokeLog:
+    # Every key a round saw, as two parallel arrays: seconds since the first
+    # keystroke ('d') and the codepoint typed ('I'), with BACKSPACE for each
+    # deleted character. A paste records all its characters at one instant.
+    # The passage and the round's scored time are kept alongside, so a
+    # stored log can be replayed and rescored.
+
+    __slots__ = ("times", "codes", "passage", "elapsed")
+
+    def __init__(self, passage=None):
+        self.times = array('d')
+        self.codes = array('I')
+        self.passage = passage
+        self.elapsed = None
+
+    def __len__(self):
+        return len(self.codes)
+
+    def record(self, old, new, timestamp):
+        # Log the edit that turned the entry contents `old` into `new`
+        if new.startswith(old):
+            start = len(old)
+        else:
+            start = 0
+            limit = min(len(old), len(new))
+            while start < limit and old[start] == new[start]:
+                start += 1
+        deleted = len(old) - start
+        if deleted:
+            self.times.extend([timestamp] * deleted)
+            self.codes.extend([BACKSPACE] * deleted)
+        for char in new[start:]:
+            self.times.append(timestamp)
+            self.codes.append(ord(char))
+
+    def events(self):
+        return zip(self.times, self.codes)
+
+    def entries(self):
+        # (timestamp, entry contents) after each recorded edit, i.e. what
+        # the key handler saw; events sharing a timestamp were one edit
+        typed = []
+        previous = None
+        for timestamp, code in zip(self.times, self.codes):
+            if previous is not None and timestamp != previous:
+                yield previous, "".join(typed)
+            previous = timestamp
+            if code == BACKSPACE:
+                if typed:
+                    typed.pop()
+            else:
+                typed.append(chr(code))
+        if previous is not None:
+            yield previous, "".join(typed)
+
+    def to_blob(self):
+        # Times are stored as millisecond deltas, which zlib squeezes down to
+        # a byte or two per keystroke
+        deltas = array('I')
+        previous = 0
+        for t in self.times:
+            ms = int(round(t * 1000))
+            deltas.append(max(ms - previous, 0))
+            previous = max(ms, previous)
+        codes = array('I', self.codes)
+        if sys.byteorder == "big":
+            deltas.byteswap()
+            codes.byteswap()
+        elapsed = self.elapsed if self.elapsed is not None else math.nan
+        passage = self.passage.encode("utf-8") if self.passage is not None else b""
+        payload = _HEADER.pack(BLOB_VERSION, len(codes), elapsed) + deltas.tobytes() + codes.tobytes() + passage
+        return zlib.compress(payload, 9)
+
+    @classmethod
+    def from_blob(cls, blob):
+        payload = zlib.decompress(blob)
+        version = payload[0]
+        if version == 1:
+            _, count = _HEADER_V1.unpack_from(payload)
+            elapsed = math.nan
+            start = _HEADER_V1.size
+        elif version == BLOB_VERSION:
+            _, count, elapsed = _HEADER.unpack_from(payload)
+            start = _HEADER.size
+        else:
+            raise ValueError(f"Unsupported keystroke log version {version}")
+        size = array('I').itemsize * count
+        deltas = array('I')
+        deltas.frombytes(payload[start:start + size])
+        codes = array('I')
+        codes.frombytes(payload[start + size:start + 2 * size])
+        if sys.byteorder == "big":
+            deltas.byteswap()
+            codes.byteswap()
+
+        log = cls()
+        ms = 0
+        for delta in deltas:
+            ms += delta
+            log.times.append(ms / 1000)
+        log.codes = codes
+        if version > 1:
+            log.passage = payload[start + 2 * size:].decode("utf-8")
+            log.elapsed = elapsed if not math.isnan(elapsed) else None
+        return log
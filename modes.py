@@ -0,0 +1,96 @@
+import os
+import sys
+
+from passage import passage_info
+
+# Test modes. A TestConfig says how long a round runs, how many rounds a
+# test has and how each round's passage is cut; the app reads all of that
+# from the one config rather than assuming three 60-second rounds.
+#
+# Pick one with --mode NAME or TYPINGTEST_MODE=NAME, or on the name screen.
+
+ROUNDS = 3
+
+
+class TestConfig:
+    __slots__ = ("name", "label", "time_limit", "word_count", "rounds")
+
+    def __init__(self, name, label, time_limit=None, word_count=None, rounds=ROUNDS):
+        self.name = name
+        self.label = label
+        self.time_limit = time_limit  # Seconds per round; None counts up
+        self.word_count = word_count  # Words per round; None for whole passages
+        self.rounds = rounds  # None for endless
+
+    def __repr__(self):
+        return f"TestConfig({self.name!r})"
+
+    @property
+    def endless(self):
+        return self.rounds is None
+
+    def has_next(self, round_index):
+        return self.rounds is None or round_index < self.rounds - 1
+
+    def round_label(self, round_index):
+        if self.rounds is None:
+            return f"Test {round_index + 1}"
+        return f"Test {round_index + 1} of {self.rounds}"
+
+    def passage(self, texts, index):
+        # Round `index`'s passage from a pool of texts. In word-count modes a
+        # text too short is topped up from the texts after it; each text is
+        # cut from its own word offsets, so only the result gets metadata.
+        if self.word_count is None:
+            return texts[index % len(texts)]
+        parts = []
+        remaining = self.word_count
+        n = index
+        while remaining > 0 and n < index + len(texts):
+            info = passage_info(texts[n % len(texts)])
+            parts.append(info.prefix(remaining))
+            remaining -= info.words
+            n += 1
+        return " ".join(parts)
+
+    def passages(self, texts, start=0, count=None):
+        # Passages for rounds start.. with their metadata computed now, so
+        # starting each round only looks it up
+        if count is None:
+            count = len(texts) if self.rounds is None else self.rounds - start
+        passages = [self.passage(texts, index) for index in range(start, start + count)]
+        for text in passages:
+            passage_info(text)
+        return passages
+
+
+MODES = {
+    config.name: config
+    for config in [
+        TestConfig("timed-15", "15 seconds", time_limit=15),
+        TestConfig("timed-30", "30 seconds", time_limit=30),
+        TestConfig("timed-60", "60 seconds", time_limit=60),
+        TestConfig("timed-120", "120 seconds", time_limit=120),
+        TestConfig("words-10", "10 words", word_count=10),
+        TestConfig("words-25", "25 words", word_count=25),
+        TestConfig("words-50", "50 words", word_count=50),
+        TestConfig("words-100", "100 words", word_count=100),
+        TestConfig("endless", "Endless", rounds=None),
+    ]
+}
+DEFAULT_MODE = "timed-60"
+
+
+def mode_from_argv(argv=None):
+    # The TestConfig named on the command line or in the environment
+    argv = sys.argv if argv is None else argv
+    name = os.environ.get("TYPINGTEST_MODE") or DEFAULT_MODE
+    if "--mode" in argv:
+        position = argv.index("--mode")
+        if position + 1 < len(argv):
+            name = argv[position + 1]
+    config = MODES.get(name)
+    if config is None:
+        print(f"Unknown mode {name!r}, using {DEFAULT_MODE} (modes: {', '.join(MODES)})")
+        config = MODES[DEFAULT_MODE]
+    return config
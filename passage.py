@@ -0,0 +1,100 @@
+import re
+from array import array
+
+# Facts about a passage that do not depend on what is typed: word spans,
+# counts of the characters that slow typists down, the key presses it
+# takes, and the per-character position masks the alignment runs on. They
+# are computed once per distinct text and kept for the session, so loading
+# a round, resetting it or switching modes never re-scans the passage.
+
+MAX_CACHED = 64
+
+# Characters typed with Shift on a US layout, besides capitals
+SHIFTED = frozenset('~!@#$%^&*()_+{}|:"<>?')
+
+_WORD = re.compile(r"\S+")
+
+
+class PassageInfo:
+    __slots__ = (
+        "text",
+        "word_starts",
+        "word_ends",
+        "masks",
+        "uppercase",
+        "digits",
+        "punctuation",
+        "keystrokes",
+    )
+
+    def __init__(self, text):
+        self.text = text
+
+        # Offsets of every word, as text.split() would find them
+        self.word_starts = array('I')
+        self.word_ends = array('I')
+        for match in _WORD.finditer(text):
+            self.word_starts.append(match.start())
+            self.word_ends.append(match.end())
+
+        positions = {}
+        for i, char in enumerate(text):
+            positions.setdefault(char, []).append(i)
+
+        # {character: little-endian bytes with bit i set where text[i] is
+        # that character}. Kept as bytes so the aligner can read the few
+        # bytes under its band of rows without shifting a passage-long int.
+        self.masks = {}
+        size = (len(text) + 7) // 8
+        for char, indexes in positions.items():
+            bits = bytearray(size)
+            for i in indexes:
+                bits[i >> 3] |= 1 << (i & 7)
+            self.masks[char] = bytes(bits)
+
+        # Class counts go per distinct character, so a class test runs a few
+        # dozen times rather than once per character
+        self.uppercase = self.digits = self.punctuation = 0
+        shifted = 0
+        for char, indexes in positions.items():
+            count = len(indexes)
+            if char.isalpha():
+                if char.isupper():
+                    self.uppercase += count
+                    shifted += count
+            elif char.isdigit():
+                self.digits += count
+            elif not char.isspace():
+                self.punctuation += count
+                if char in SHIFTED:
+                    shifted += count
+
+        # Key presses for a perfect run, counting Shift once per character
+        self.keystrokes = len(text) + shifted
+
+    @property
+    def words(self):
+        return len(self.word_starts)
+
+    def __len__(self):
+        return len(self.text)
+
+    def prefix(self, words):
+        # The passage cut after its first `words` words
+        if words >= self.words:
+            return self.text
+        if words <= 0:
+            return ""
+        return self.text[:self.word_ends[words - 1]]
+
+
+_cache = {}
+
+
+def passage_info(text):
+    info = _cache.get(text)
+    if info is None:
+        if len(_cache) >= MAX_CACHED:
+            del _cache[next(iter(_cache))]  # Oldest first
+        info = _cache[text] = PassageInfo(text)
+    return info
@@ -0,0 +1,221 @@
+import argparse
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import time
+
+from keylog import KeystrokeLog
+from session import TypingSession
+from storage import DB_NAMES, RESULT_COLUMNS, RESULT_TABLES, create_schema
+
+# Regression replay of recorded rounds.
+#
+#   python replay.py                         # every stored round, flat out
+#   python replay.py --speed 4 --user Ann    # 4x real time, one user
+#   python replay.py --no-render             # scoring only, no Tk
+#
+# Each stored keystroke log is fed, edit by edit, through TypingSession and
+# the prompt highlighter, exactly as the key handler would, and the rescored
+# round is compared with the metrics stored for it. The rendered tags are
+# checked against the scored character states at the end of each round.
+# Differences are listed and the exit status is 1 if there were any.
+#
+# Rendering needs an X display. On a headless box pass --xvfb (or just run
+# without DISPLAY set) to start a private Xvfb server for the run; without
+# one the replay falls back to scoring only.
+
+# Largest difference from the stored value that still counts as equal;
+# percentages are stored to a hundredth of a percent
+TOLERANCES = {"gross_wpm": 0, "net_wpm": 0, "word_accuracy": 0.005, "error_rate": 0.005}
+METRICS = list(TOLERANCES)
+
+CHUNK_ROWS = 500
+
+
+def stored_rounds(conn, user_name=None, limit=None):
+    # (result row, keystroke log) pairs, oldest first, streamed in chunks
+    sql = f'''
+        SELECT {RESULT_COLUMNS}, k.data
+        FROM {RESULT_TABLES} JOIN keystroke_logs k ON k.result_id = r.id
+    '''
+    params = []
+    if user_name is not None:
+        sql += ' WHERE u.name = ?'
+        params.append(user_name)
+    sql += ' ORDER BY r.id LIMIT ?'
+    params.append(-1 if limit is None else limit)
+    cursor = conn.execute(sql, params)
+    while True:
+        rows = cursor.fetchmany(CHUNK_ROWS)
+        if not rows:
+            break
+        for row in rows:
+            yield row[:7], KeystrokeLog.from_blob(row[8])
+
+
+def start_xvfb():
+    # Start a private virtual X server and point DISPLAY at it
+    binary = shutil.which("Xvfb")
+    if binary is None:
+        return None
+    read_fd, write_fd = os.pipe()
+    server = subprocess.Popen(
+        [binary, "-displayfd", str(write_fd), "-screen", "0", "1280x800x24", "-nolisten", "tcp"],
+        pass_fds=(write_fd,),
+        stderr=subprocess.DEVNULL
+    )
+    os.close(write_fd)
+    with os.fdopen(read_fd) as f:
+        display = f.readline().strip()
+    if not display:
+        server.terminate()
+        return None
+    os.environ["DISPLAY"] = f":{display}"
+    return server
+
+
+class Renderer:
+    # A prompt widget configured like the app's, driven the same way
+
+    def __init__(self):
+        import tkinter as tk
+        from highlighting import PromptHighlighter
+
+        self.root = tk.Tk()
+        self.root.title("Replay")
+        self.widget = tk.Text(self.root, wrap=tk.WORD, font=("Helvetica", 18), height=10, width=100)
+        self.widget.pack(fill=tk.BOTH, expand=True)
+        self.widget.tag_configure("correct", foreground="#2ECC71")
+        self.widget.tag_configure("incorrect", foreground="#E74C3C")
+        self.widget.tag_configure("current_word", underline=True)
+        self.highlighter = PromptHighlighter(self.widget)
+
+    def load(self, session):
+        self.highlighter.load(session.text, session.score.aligner.word_span())
+
+    def show(self, session):
+        aligner = session.score.aligner
+        start, end = aligner.changed
+        self.highlighter.show(aligner.status, start, end, aligner.row, aligner.word_span())
+        self.root.update_idletasks()
+
+    def check(self, session):
+        # Positions in the visible window whose tag disagrees with the
+        # scored state, as a list of offsets
+        from highlighting import TAG_NAMES
+
+        highlighter = self.highlighter
+        status = session.score.aligner.status
+        start = highlighter._win_start
+        tagged = bytearray(highlighter._win_end - start)
+        for value, name in TAG_NAMES.items():
+            ranges = self.widget.tag_ranges(name)
+            for first, last in zip(ranges[::2], ranges[1::2]):
+                for position in range(self._offset(first), self._offset(last)):
+                    tagged[position] = value
+        return [start + i for i, value in enumerate(tagged) if value != status[start + i]]
+
+    def _offset(self, index):
+        # Text.count gives None rather than 0 for an empty range
+        count = self.widget.count("1.0", index, "chars")
+        return count[0] if count else 0
+
+    def close(self):
+        self.root.destroy()
+
+
+def replay_round(log, renderer=None, speed=0):
+    # Rescore one stored round; returns the session and its RoundResult
+    session = TypingSession(log.passage, time_limit=None)
+    if renderer is not None:
+        renderer.load(session)
+    started = time.perf_counter()
+    for timestamp, typed in log.entries():
+        if speed > 0:
+            delay = started + timestamp / speed - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        session.apply(typed, timestamp)
+        if renderer is not None:
+            renderer.show(session)
+    elapsed = log.elapsed if log.elapsed is not None else session.elapsed()
+    return session, session.results(elapsed)
+
+
+def compare(row, result):
+    # [(metric, stored, replayed)] for every metric that changed
+    stored = dict(zip(METRICS, row[3:7]))
+    differences = []
+    for metric in METRICS:
+        replayed = getattr(result, metric)
+        if stored[metric] is None or abs(stored[metric] - replayed) > TOLERANCES[metric] + 1e-9:
+            differences.append((metric, stored[metric], replayed))
+    return differences
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay stored rounds and check them against their scores")
+    parser.add_argument("--db", default=DB_NAMES[0])
+    parser.add_argument("--user")
+    parser.add_argument("--limit", type=int)
+    parser.add_argument("--speed", type=float, default=0,
+                        help="replay at N times real time (default: as fast as possible)")
+    parser.add_argument("--no-render", action="store_true", help="score only, without the Tk highlighter")
+    parser.add_argument("--xvfb", action="store_true", help="run the highlighter on a private Xvfb display")
+    args = parser.parse_args(argv)
+
+    server = None
+    renderer = None
+    if not args.no_render:
+        if args.xvfb or (sys.platform.startswith("linux") and not os.environ.get("DISPLAY")):
+            server = start_xvfb()
+            if server is None:
+                print("Xvfb not available, replaying without rendering", file=sys.stderr)
+        if server is not None or os.environ.get("DISPLAY") or not sys.platform.startswith("linux"):
+            renderer = Renderer()
+
+    conn = sqlite3.connect(args.db)
+    create_schema(conn)  # Older files are migrated first
+    rounds = differing = skipped = render_errors = keystrokes = 0
+    start = time.perf_counter()
+    try:
+        for row, log in stored_rounds(conn, args.user, args.limit):
+            if log.passage is None:
+                skipped += 1  # Recorded before passages were kept with the log
+                continue
+            session, result = replay_round(log, renderer, args.speed)
+            rounds += 1
+            keystrokes += len(log)
+            differences = compare(row, result)
+            if differences:
+                differing += 1
+                changes = ", ".join(f"{metric} {old} -> {new}" for metric, old, new in differences)
+                print(f"Result {row[0]} ({row[1]}, round {row[2]}): {changes}")
+            if renderer is not None:
+                wrong = renderer.check(session)
+                if wrong:
+                    render_errors += 1
+                    print(f"Result {row[0]} ({row[1]}, round {row[2]}): "
+                          f"{len(wrong)} character(s) tagged wrongly, first at {wrong[0]}")
+    finally:
+        elapsed = time.perf_counter() - start
+        conn.close()
+        if renderer is not None:
+            renderer.close()
+        if server is not None:
+            server.terminate()
+
+    rate = keystrokes / elapsed if elapsed > 0 else 0
+    print(
+        f"Replayed {rounds} round(s), {keystrokes} keystrokes in {elapsed:.2f}s ({rate:,.0f} keys/s, "
+        f"{'with' if renderer is not None else 'without'} rendering): "
+        f"{differing} scored differently, {render_errors} rendered differently, "
+        f"{skipped} skipped without a stored passage"
+    )
+    return 1 if differing or render_errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
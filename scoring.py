@@ -0,0 +1,177 @@
+import math
+from array import array
+
+from alignment import Aligner
+
+
+class ScoreTracker:
+    # Running score for one round, fed with the entry contents on every
+    # keystroke. Errors and correct words come from an incremental
+    # alignment of the typed text against the passage (see alignment.py),
+    # so a skipped or doubled character counts once instead of making the
+    # rest of the passage wrong. Only the words after the first change are
+    # re-split, so an update costs the size of the edit rather than the
+    # length of the passage.
+
+    def __init__(self, text=""):
+        self.load(text)
+
+    def load(self, text):
+        self.text = text
+        self.aligner = Aligner(text)
+        self.typed = ""
+        self.keystrokes = 0
+        self.corrections = 0
+        # (start, end) of every word typed so far
+        self._words = []
+
+    def update(self, typed):
+        old = self.typed
+        if typed == old:
+            return
+
+        if typed.startswith(old):
+            start = len(old)
+        elif old.startswith(typed):
+            start = len(typed)
+        else:
+            start = 0
+            limit = min(len(old), len(typed))
+            while start < limit and old[start] == typed[start]:
+                start += 1
+
+        self.keystrokes += len(typed) - start
+        self.corrections += len(old) - start
+
+        self.aligner.update(typed)
+
+        # Drop the words the edit touched, then re-split from there
+        words = self._words
+        rescan = start
+        while words and words[-1][1] >= start:
+            rescan = words.pop()[0]
+        self._split_words(typed, rescan)
+        self.typed = typed
+
+    def _split_words(self, typed, pos):
+        words = self._words
+        length = len(typed)
+        while pos < length:
+            while pos < length and typed[pos].isspace():
+                pos += 1
+            if pos >= length:
+                break
+            word_start = pos
+            while pos < length and not typed[pos].isspace():
+                pos += 1
+            words.append((word_start, pos))
+
+    @property
+    def errors(self):
+        return self.aligner.distance
+
+    @property
+    def correct_words(self):
+        return self.aligner.correct_words
+
+    @property
+    def total_keystrokes(self):
+        return len(self.typed)
+
+    @property
+    def total_words(self):
+        return max(len(self._words), self.aligner.passage_words)
+
+    def word_accuracy(self):
+        total = self.total_words
+        return (self.correct_words / total) * 100 if total > 0 else 0
+
+    def char_accuracy(self):
+        total = self.total_keystrokes
+        return ((total - self.errors) / total) * 100 if total > 0 else 100
+
+    def error_rate(self):
+        total = self.total_keystrokes
+        return (self.errors / total * 100) if total > 0 else 0
+
+    def gross_wpm(self, elapsed_time):
+        minutes = elapsed_time / 60
+        return int((self.total_keystrokes / 5) / minutes) if minutes > 0 else 0
+
+    def net_wpm(self, elapsed_time):
+        minutes = elapsed_time / 60
+        return int(((self.total_keystrokes - self.errors) / 5) / minutes) if minutes > 0 else 0
+
+
+class RoundResult:
+    # Metrics of one finished round, carried as numbers from scoring through
+    # to the results page
+
+    __slots__ = (
+        "round_number",
+        "elapsed_time",
+        "gross_wpm",
+        "net_wpm",
+        "word_accuracy",
+        "error_rate",
+        "keystrokes",
+        "corrections",
+    )
+
+    def __init__(self, round_number, elapsed_time, gross_wpm, net_wpm, word_accuracy, error_rate,
+                 keystrokes=0, corrections=0):
+        self.round_number = round_number
+        self.elapsed_time = elapsed_time
+        self.gross_wpm = gross_wpm
+        self.net_wpm = net_wpm
+        self.word_accuracy = word_accuracy
+        self.error_rate = error_rate
+        self.keystrokes = keystrokes
+        self.corrections = corrections
+
+    def __repr__(self):
+        return f"RoundResult(round={self.round_number}, net_wpm={self.net_wpm}, accuracy={self.word_accuracy:.1f})"
+
+    def format(self, with_time=True):
+        lines = [f"Time: {self.elapsed_time:.1f}s"] if with_time else []
+        lines += [
+            f"Gross WPM: {self.gross_wpm}",
+            f"Net WPM: {self.net_wpm}",
+            f"Word Accuracy: {self.word_accuracy:.1f}%",
+            f"Error Rate: {self.error_rate:.1f}%",
+        ]
+        return "\n".join(lines)
+
+
+class ScoreSummary:
+    # Aggregates over any number of RoundResults, computed once from
+    # packed arrays of the metric columns
+
+    def __init__(self, results):
+        self.count = len(results)
+        net_wpm = array('d', (r.net_wpm for r in results))
+        accuracy = array('d', (r.word_accuracy for r in results))
+        error_rate = array('d', (r.error_rate for r in results))
+
+        self.avg_wpm = _mean(net_wpm)
+        self.avg_accuracy = _mean(accuracy)
+        self.avg_error_rate = _mean(error_rate)
+        self.wpm_stdev = _pstdev(net_wpm, self.avg_wpm)
+
+        if results:
+            best = max(range(self.count), key=net_wpm.__getitem__)
+            worst = min(range(self.count), key=net_wpm.__getitem__)
+            self.best = results[best]
+            self.worst = results[worst]
+        else:
+            self.best = self.worst = None
+
+
+def _mean(values):
+    return math.fsum(values) / len(values) if values else 0
+
+
+def _pstdev(values, mean):
+    if len(values) < 2:
+        return 0
+    return math.sqrt(math.fsum((v - mean) ** 2 for v in values) / len(values))
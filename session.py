@@ -0,0 +1,89 @@
+from analytics import KeyStats
+from keylog import KeystrokeLog
+from scoring import RoundResult, ScoreTracker
+
+
+class TypingSession:
+    # GUI-free state of one round.
+    # Fed timestamped keystroke events (or the entry contents after each
+    # event, which is what the Tk app sees) and produces the same metrics as
+    # TypingTest.calculate_results. Timestamps are seconds on any monotonic
+    # clock; only differences between them are used. A time_limit of None
+    # means the round is untimed.
+
+    def __init__(self, text="", time_limit=60):
+        self.time_limit = time_limit
+        self.load(text)
+
+    def load(self, text):
+        self.text = text
+        self.typed = ""
+        self.start_time = None
+        self.last_time = None
+        self.score = ScoreTracker(text)
+        self.keylog = KeystrokeLog(text)
+        self.key_stats = KeyStats()
+
+    @property
+    def started(self):
+        return self.start_time is not None
+
+    @property
+    def complete(self):
+        # The whole passage has been typed; the app auto-submits here
+        return len(self.typed) >= len(self.text)
+
+    def apply(self, typed, timestamp):
+        # New entry contents after a key event
+        if self.start_time is None:
+            if not typed:
+                return
+            self.start_time = timestamp
+        previous_time = self.last_time
+        self.last_time = timestamp
+        self.keylog.record(self.typed, typed, timestamp - self.start_time)
+        single_key = len(typed) == len(self.typed) + 1 and typed.startswith(self.typed)
+        position = self.score.aligner.row
+        self.typed = typed
+        self.score.update(typed)
+
+        # Per-key counters: the key pressed against the passage character
+        # the typist was at. Pastes and deletions are not keystrokes here.
+        if single_key and position < len(self.text):
+            latency = timestamp - previous_time if previous_time is not None else None
+            previous = self.text[position - 1] if position > 0 else None
+            self.key_stats.record(self.text[position], typed[-1], latency, previous)
+
+    def type_char(self, char, timestamp):
+        self.apply(self.typed + char, timestamp)
+
+    def backspace(self, timestamp):
+        self.apply(self.typed[:-1], timestamp)
+
+    def paste(self, text, timestamp):
+        self.apply(self.typed + text, timestamp)
+
+    def elapsed(self, timestamp=None):
+        if self.start_time is None:
+            return 0.0
+        end = self.last_time if timestamp is None else timestamp
+        if self.time_limit is None:
+            return end - self.start_time
+        return min(end - self.start_time, self.time_limit)
+
+    def results(self, elapsed_time, round_number=1):
+        score = self.score
+        self.keylog.elapsed = elapsed_time
+        return RoundResult(
+            round_number,
+            elapsed_time,
+            score.gross_wpm(elapsed_time),
+            score.net_wpm(elapsed_time),
+            score.word_accuracy(),
+            score.error_rate(),
+            score.keystrokes,
+            score.corrections,
+        )
+
+    def finish(self, timestamp=None, round_number=1):
+        return self.results(self.elapsed(timestamp), round_number)
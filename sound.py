@@ -0,0 +1,118 @@
+import math
+import os
+import sys
+import threading
+import time
+from array import array
+
+# Key-click feedback.
+#
+# The mixer is opened on a background thread at startup with a small
+# buffer, and the click and error sounds are synthesized once into memory.
+# Playing a sound is then a single call on a channel from a fixed pool,
+# taken round-robin, so bursts of keystrokes never allocate, decode or
+# block the Tk thread; the oldest click is cut off when the pool is busy.
+#
+# pygame is optional. Without it, or without an audio device, every call
+# is a no-op. Disable with --mute or TYPINGTEST_SOUND=0.
+
+FREQUENCY = 44100
+BUFFER_SAMPLES = 256  # ~6ms at 44.1kHz
+CHANNELS = 8
+
+CLICK = "click"
+ERROR = "error"
+
+
+def _click(frequency):
+    # 12ms of a high tone with a fast exponential decay
+    n = int(frequency * 0.012)
+    return [math.sin(2 * math.pi * 2200 * i / frequency) * math.exp(-i / (n / 6)) * 0.5 for i in range(n)]
+
+
+def _buzz(frequency):
+    # 70ms low square-ish tone for a wrong key
+    n = int(frequency * 0.07)
+    return [
+        (0.35 if math.sin(2 * math.pi * 180 * i / frequency) >= 0 else -0.35) * math.exp(-i / (n / 3))
+        for i in range(n)
+    ]
+
+
+SAMPLES = {CLICK: _click, ERROR: _buzz}
+
+
+class KeySounds:
+    def __init__(self, enabled=True, instrumentation=None):
+        self.enabled = enabled
+        self.instrumentation = instrumentation
+        self.available = False
+        self.output_latency = 0.0  # Seconds of mixer buffer after play()
+        self._mixer = None
+        self._sounds = {}
+        self._channels = []
+        self._next = 0
+        self._ready = threading.Event()
+        if enabled:
+            thread = threading.Thread(target=self._open, name="sound-init")
+            thread.daemon = True
+            thread.start()
+
+    def _open(self):
+        try:
+            import pygame
+
+            pygame.mixer.pre_init(FREQUENCY, -16, 1, BUFFER_SAMPLES)
+            pygame.mixer.init()
+            frequency, size, channels = pygame.mixer.get_init()
+            if size != -16:
+                raise RuntimeError(f"unsupported sample format {size}")
+            for name, synthesize in SAMPLES.items():
+                self._sounds[name] = pygame.mixer.Sound(buffer=_pcm(synthesize(frequency), channels))
+            pygame.mixer.set_num_channels(CHANNELS)
+            pygame.mixer.set_reserved(CHANNELS)
+            self._channels = [pygame.mixer.Channel(i) for i in range(CHANNELS)]
+            self.output_latency = BUFFER_SAMPLES / frequency
+            self._mixer = pygame.mixer
+            self.available = True
+        except ImportError:
+            print("pygame not installed, key sounds disabled")
+        except Exception as e:
+            print(f"No audio output, key sounds disabled: {e}")
+        finally:
+            self._ready.set()
+
+    def play(self, name, event_time=None):
+        # event_time is the perf_counter time of the key event, for the
+        # event-to-sound latency histogram
+        if not self.available:
+            return
+        channel = self._channels[self._next]
+        self._next = (self._next + 1) % CHANNELS
+        channel.play(self._sounds[name])
+        if event_time is not None and self.instrumentation is not None and self.instrumentation.enabled:
+            self.instrumentation.histogram("key_to_sound").add(
+                (time.perf_counter() - event_time + self.output_latency) * 1e6
+            )
+
+    def close(self):
+        self._ready.wait(1)
+        if self._mixer is not None:
+            self._mixer.quit()
+            self._mixer = None
+            self.available = False
+
+
+def _pcm(samples, channels):
+    # Signed 16-bit native-endian PCM, interleaved for the mixer's channels
+    pcm = array('h')
+    for sample in samples:
+        value = int(max(-1.0, min(1.0, sample)) * 32767)
+        for _ in range(channels):
+            pcm.append(value)
+    return pcm.tobytes()
+
+
+def enabled_from_argv(argv=None):
+    argv = sys.argv if argv is None else argv
+    return "--mute" not in argv and os.environ.get("TYPINGTEST_SOUND") != "0"
@@ -0,0 +1,105 @@
+import builtins
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+# Startup timing mode: run with --startup-timing (or TYPINGTEST_STARTUP_TIMING=1)
+# to get a breakdown of where launch time goes. This module is imported
+# first by app.py so the import hook sees every import after it.
+#
+# For launch benchmarks, --first-window-file PATH (or
+# TYPINGTEST_FIRST_WINDOW_FILE) makes the app write the wall-clock time of
+# its first paint to PATH and quit; see benchmarks/bench_startup.py.
+
+_START = time.perf_counter()
+
+
+class StartupTimer:
+    def __init__(self, enabled):
+        self.enabled = enabled
+        self.imports = []
+        self.phases = []
+        self._depth = 0
+        self._reported = False
+        self._original_import = None
+        if enabled:
+            self._install_import_hook()
+
+    def _install_import_hook(self):
+        # Time only outermost imports so nested ones are counted once
+        self._original_import = builtins.__import__
+        original = self._original_import
+
+        def timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+            if self._depth or name in sys.modules:
+                return original(name, globals, locals, fromlist, level)
+            self._depth += 1
+            start = time.perf_counter()
+            try:
+                return original(name, globals, locals, fromlist, level)
+            finally:
+                self._depth -= 1
+                self.imports.append((name, time.perf_counter() - start))
+
+        builtins.__import__ = timed_import
+
+    @contextmanager
+    def phase(self, name):
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, start - _START, time.perf_counter() - start))
+
+    def mark(self, name):
+        # Record a point in time with no duration (e.g. first paint)
+        if self.enabled:
+            self.phases.append((name, time.perf_counter() - _START, None))
+
+    def report(self, out=None):
+        if not self.enabled or self._reported:
+            return
+        self._reported = True
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+        out = out or sys.stderr
+
+        print("Startup timing (ms)", file=out)
+        print("  imports:        took", file=out)
+        for name, elapsed in self.imports:
+            print(f"    {'':>9} {elapsed * 1000:9.1f}  {name}", file=out)
+        print("  phases:    at   took", file=out)
+        for name, at, elapsed in self.phases:
+            took = f"{elapsed * 1000:9.1f}" if elapsed is not None else f"{'':>9}"
+            print(f"    {at * 1000:9.1f} {took}  {name}", file=out)
+        print(f"  total: {(time.perf_counter() - _START) * 1000:.1f}", file=out)
+
+
+def first_window_file(argv=None):
+    argv = sys.argv if argv is None else argv
+    if "--first-window-file" in argv:
+        position = argv.index("--first-window-file")
+        if position + 1 < len(argv):
+            return argv[position + 1]
+    return os.environ.get("TYPINGTEST_FIRST_WINDOW_FILE")
+
+
+def first_window(root):
+    # Called once the first window has been painted. In benchmark mode,
+    # record the time and close the app.
+    path = first_window_file()
+    if not path:
+        return False
+    with open(path, "w") as f:
+        f.write(f"{time.time():.6f}\n")
+    root.after(0, root.destroy)
+    return True
+
+
+profile = StartupTimer(
+    "--startup-timing" in sys.argv or os.environ.get("TYPINGTEST_STARTUP_TIMING") == "1"
+)
@@ -0,0 +1,516 @@
+import os
+import queue
+import sqlite3
+import sys
+import threading
+
+from keylog import KeystrokeLog
+
+DB_NAMES = ['typing_scores.db', 'typing_test.db']
+
+# Older databases that `python storage.py migrate` picks up by default
+LEGACY_DB_NAMES = ['typing_results.db']
+
+# Most rows a single transaction will take from the queue
+BATCH_SIZE = 64
+
+# Rows as the rest of the app sees them; accuracy and error rate are kept
+# as integer hundredths of a percent and user names in their own table
+RESULT_COLUMNS = (
+    'r.id, u.name, r.round_number, r.gross_wpm, r.net_wpm, '
+    'r.accuracy_bp / 100.0, r.error_rate_bp / 100.0, r.timestamp'
+)
+RESULT_TABLES = 'typing_results r JOIN users u ON u.id = r.user_id'
+
+_STOP = object()
+
+
+class PendingRead:
+    # A read queued on the ResultStore worker. `done` is set once `result`
+    # holds what the read method returned (None if it failed).
+    __slots__ = ("method", "args", "kwargs", "done", "result")
+
+    def __init__(self, method, args, kwargs):
+        self.method = method
+        self.args = args
+        self.kwargs = kwargs
+        self.done = threading.Event()
+        self.result = None
+
+
+def connect(db_name):
+    # A connection set up for a single long-lived writer
+    conn = sqlite3.connect(db_name)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    create_schema(conn)
+    return conn
+
+
+# Schema migrations, in order. PRAGMA user_version records how many have
+# run; each one runs in its own transaction together with the version
+# bump, so an interrupted migration is simply retried on the next start.
+
+def _migrate_unversioned(conn):
+    # 1: the layout used before versioning, plus the rows of the original
+    # `results` table if this file still has one
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS typing_results (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_name TEXT,
+            round_number INTEGER,
+            gross_wpm INTEGER,
+            net_wpm INTEGER,
+            accuracy REAL,
+            error_rate REAL,
+            timestamp REAL
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS key_stats (
+            user_name TEXT,
+            kind TEXT,
+            sequence TEXT,
+            attempts INTEGER,
+            errors INTEGER,
+            latency_ms REAL,
+            timed INTEGER,
+            PRIMARY KEY (user_name, kind, sequence)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS keystroke_logs (
+            result_id INTEGER PRIMARY KEY REFERENCES typing_results (id),
+            data BLOB
+        )
+    ''')
+    legacy = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'results'"
+    ).fetchone()
+    if legacy:
+        # Timestamps there are text: either a number or a date string
+        conn.execute('''
+            INSERT INTO typing_results
+            (user_name, round_number, gross_wpm, net_wpm, accuracy, error_rate, timestamp)
+            SELECT user_name, round, CAST(ROUND(gross_wpm) AS INTEGER), CAST(ROUND(net_wpm) AS INTEGER),
+                   accuracy, error_rate,
+                   CASE WHEN timestamp NOT GLOB '*[^0-9.]*' THEN CAST(timestamp AS REAL)
+                        ELSE CAST(strftime('%s', timestamp) AS REAL) END
+            FROM results ORDER BY id
+        ''')
+        conn.execute('DROP TABLE results')
+
+
+def _migrate_normalized(conn):
+    # 2: user names move to a users table; results and key counters refer
+    # to users by integer id, and the percentages and timestamps become
+    # integers
+    conn.execute('''
+        CREATE TABLE users (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE
+        )
+    ''')
+    conn.execute('''
+        INSERT INTO users (name)
+        SELECT DISTINCT COALESCE(user_name, '') FROM typing_results
+        UNION SELECT DISTINCT COALESCE(user_name, '') FROM key_stats
+    ''')
+
+    conn.execute('''
+        CREATE TABLE typing_results_v2 (
+            id INTEGER PRIMARY KEY,
+            user_id INTEGER NOT NULL REFERENCES users (id),
+            round_number INTEGER,
+            gross_wpm INTEGER,
+            net_wpm INTEGER,
+            accuracy_bp INTEGER,
+            error_rate_bp INTEGER,
+            timestamp INTEGER
+        )
+    ''')
+    conn.execute('''
+        INSERT INTO typing_results_v2
+        SELECT r.id, u.id, r.round_number, r.gross_wpm, r.net_wpm,
+               CAST(ROUND(r.accuracy * 100) AS INTEGER), CAST(ROUND(r.error_rate * 100) AS INTEGER),
+               CAST(r.timestamp AS INTEGER)
+        FROM typing_results r JOIN users u ON u.name = COALESCE(r.user_name, '')
+        ORDER BY r.id
+    ''')
+    conn.execute('DROP TABLE typing_results')
+    conn.execute('ALTER TABLE typing_results_v2 RENAME TO typing_results')
+    conn.execute('''
+        CREATE INDEX idx_results_user_time
+        ON typing_results (user_id, timestamp)
+    ''')
+    conn.execute('''
+        CREATE INDEX idx_results_net_wpm
+        ON typing_results (net_wpm)
+    ''')
+    conn.execute('''
+        CREATE INDEX idx_results_round_net_wpm
+        ON typing_results (round_number, net_wpm)
+    ''')
+
+    conn.execute('''
+        CREATE TABLE key_stats_v2 (
+            user_id INTEGER NOT NULL REFERENCES users (id),
+            kind TEXT,
+            sequence TEXT,
+            attempts INTEGER,
+            errors INTEGER,
+            latency_ms REAL,
+            timed INTEGER,
+            PRIMARY KEY (user_id, kind, sequence)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+        INSERT INTO key_stats_v2
+        SELECT u.id, k.kind, k.sequence, k.attempts, k.errors, k.latency_ms, k.timed
+        FROM key_stats k JOIN users u ON u.name = COALESCE(k.user_name, '')
+    ''')
+    conn.execute('DROP TABLE key_stats')
+    conn.execute('ALTER TABLE key_stats_v2 RENAME TO key_stats')
+
+
+def _migrate_autoincrement(conn):
+    # 3: result ids are never reused again (the v1 table had AUTOINCREMENT,
+    # the v2 rebuild lost it), so a keystroke log can never end up attached
+    # to a later result after the newest one was deleted. Logs whose result
+    # is already gone are dropped, and the sequence starts past every id in
+    # use.
+    conn.execute('''
+        CREATE TABLE typing_results_v3 (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL REFERENCES users (id),
+            round_number INTEGER,
+            gross_wpm INTEGER,
+            net_wpm INTEGER,
+            accuracy_bp INTEGER,
+            error_rate_bp INTEGER,
+            timestamp INTEGER
+        )
+    ''')
+    conn.execute('INSERT INTO typing_results_v3 SELECT * FROM typing_results ORDER BY id')
+    conn.execute('DROP TABLE typing_results')
+    conn.execute('ALTER TABLE typing_results_v3 RENAME TO typing_results')
+    conn.execute('''
+        CREATE INDEX idx_results_user_time
+        ON typing_results (user_id, timestamp)
+    ''')
+    conn.execute('''
+        CREATE INDEX idx_results_net_wpm
+        ON typing_results (net_wpm)
+    ''')
+    conn.execute('''
+        CREATE INDEX idx_results_round_net_wpm
+        ON typing_results (round_number, net_wpm)
+    ''')
+    conn.execute('''
+        DELETE FROM keystroke_logs
+        WHERE result_id NOT IN (SELECT id FROM typing_results)
+    ''')
+    conn.execute("DELETE FROM sqlite_sequence WHERE name = 'typing_results'")
+    conn.execute('''
+        INSERT INTO sqlite_sequence (name, seq)
+        SELECT 'typing_results', MAX(id) FROM typing_results HAVING MAX(id) IS NOT NULL
+    ''')
+
+
+MIGRATIONS = [_migrate_unversioned, _migrate_normalized, _migrate_autoincrement]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def create_schema(conn):
+    # Bring the database up to SCHEMA_VERSION. A current database costs one
+    # PRAGMA read and no DDL. Returns the number of migrations run.
+    version = conn.execute('PRAGMA user_version').fetchone()[0]
+    if version == SCHEMA_VERSION:
+        return 0
+    if version > SCHEMA_VERSION:
+        raise sqlite3.DatabaseError(
+            f"database schema version {version} is newer than this app ({SCHEMA_VERSION})"
+        )
+    for number in range(version + 1, SCHEMA_VERSION + 1):
+        conn.execute('BEGIN')
+        try:
+            MIGRATIONS[number - 1](conn)
+            conn.execute(f'PRAGMA user_version = {number}')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    return SCHEMA_VERSION - version
+
+
+def user_id(conn, name):
+    # Id of the named user, added on first use
+    conn.execute('INSERT OR IGNORE INTO users (name) VALUES (?)', (name or '',))
+    return conn.execute('SELECT id FROM users WHERE name = ?', (name or '',)).fetchone()[0]
+
+
+def result_values(user, row):
+    # Column values for typing_results from an app-level row
+    # (user_name, round_number, gross_wpm, net_wpm, accuracy, error_rate, timestamp)
+    _, round_number, gross_wpm, net_wpm, accuracy, error_rate, timestamp = row
+    return (
+        user,
+        round_number,
+        gross_wpm,
+        net_wpm,
+        int(round(accuracy * 100)) if accuracy is not None else None,
+        int(round(error_rate * 100)) if error_rate is not None else None,
+        int(timestamp) if timestamp is not None else None,
+    )
+
+
+def insert_result(conn, row, keylog_blob=None):
+    # row is (user_name, round_number, gross_wpm, net_wpm, accuracy, error_rate, timestamp)
+    cursor = conn.execute('''
+        INSERT INTO typing_results
+        (user_id, round_number, gross_wpm, net_wpm, accuracy_bp, error_rate_bp, timestamp)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', result_values(user_id(conn, row[0]), row))
+    if keylog_blob is not None:
+        conn.execute(
+            'INSERT INTO keystroke_logs (result_id, data) VALUES (?, ?)',
+            (cursor.lastrowid, keylog_blob)
+        )
+    return cursor.lastrowid
+
+
+def upsert_key_stats(conn, rows):
+    # rows are (user_id, kind, sequence, attempts, errors, latency_ms, timed);
+    # counters are added onto the user's running totals
+    conn.executemany('''
+        INSERT INTO key_stats (user_id, kind, sequence, attempts, errors, latency_ms, timed)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (user_id, kind, sequence) DO UPDATE SET
+            attempts = attempts + excluded.attempts,
+            errors = errors + excluded.errors,
+            latency_ms = latency_ms + excluded.latency_ms,
+            timed = timed + excluded.timed
+    ''', rows)
+
+
+def migrate_files(paths):
+    # Migrate whole database files in place, compacting them afterwards
+    for path in paths:
+        conn = sqlite3.connect(path)
+        try:
+            count = create_schema(conn)
+            if count:
+                conn.execute('VACUUM')
+            print(f"{path}: schema version {SCHEMA_VERSION}, {count} migration(s) run")
+        except sqlite3.Error as e:
+            print(f"{path}: migration failed: {e}")
+        finally:
+            conn.close()
+
+
+class ResultStore:
+    # Write-behind persistence for round results.
+    # The Tk thread only puts rows on a queue. A single worker thread owns
+    # the SQLite connection (opened once, in WAL mode) and writes whatever
+    # has queued up in one transaction, so the UI never waits on disk.
+
+    def __init__(self, db_names=DB_NAMES):
+        self.db_names = list(db_names)
+        self.db_name = self.db_names[0]
+        self._queue = queue.Queue()
+        self._ready = threading.Event()
+        self._reader = None
+        self._worker_conn = None
+        self._thread = threading.Thread(target=self._run, name="result-writer")
+        self._thread.daemon = True  # close() flushes; daemon only guards against hangs
+        self._thread.start()
+
+    def save_result(self, user_name, round_number, gross_wpm, net_wpm, accuracy, error_rate, timestamp,
+                    keylog=None, key_stats=None):
+        # The keystroke log is compressed, and the key counters merged, on
+        # the worker, not here
+        row = (user_name, round_number, gross_wpm, net_wpm, accuracy, error_rate, timestamp)
+        self._queue.put((row, keylog, key_stats))
+
+    def flush(self, timeout=2):
+        # Wait until everything queued so far has been written
+        return self.drained().wait(timeout)
+
+    def drained(self):
+        # An Event the worker sets once everything queued so far has been
+        # written, for callers that must not block on it (the Tk thread
+        # polls it with after)
+        done = threading.Event()
+        self._queue.put(done)
+        return done
+
+    def fetch(self, method, *args, **kwargs):
+        # Run a read method (history, key_stats, ...) on the worker, after
+        # everything queued so far has been written, so the Tk thread never
+        # waits on a query. Poll the returned PendingRead's done Event with
+        # after.
+        read = PendingRead(getattr(self, method), args, kwargs)
+        self._queue.put(read)
+        return read
+
+    def key_stats(self, user_name, kind="key", limit=None, min_attempts=1):
+        # A user's aggregated counters as (sequence, attempts, errors,
+        # latency_ms, timed), worst error rate first
+        return self._query('''
+            SELECT k.sequence, k.attempts, k.errors, k.latency_ms, k.timed
+            FROM key_stats k JOIN users u ON u.id = k.user_id
+            WHERE u.name = ? AND k.kind = ? AND k.attempts >= ?
+            ORDER BY CAST(k.errors AS REAL) / k.attempts DESC, k.attempts DESC
+            LIMIT ?
+        ''', (user_name, kind, min_attempts, -1 if limit is None else limit))
+
+    def keystroke_log(self, result_id):
+        rows = self._query('SELECT data FROM keystroke_logs WHERE result_id = ?', (result_id,))
+        return KeystrokeLog.from_blob(rows[0][0]) if rows else None
+
+    def close(self, timeout=5):
+        # Flush everything queued so far and stop the worker
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+
+    def history(self, user_name, limit=50, before=None):
+        # One page of a user's rounds, newest first. Pass the (timestamp, id)
+        # of the last row of the previous page as `before` to get the next
+        # one; seeking on the index keeps deep pages as cheap as the first.
+        if before is None:
+            return self._query(f'''
+                SELECT {RESULT_COLUMNS} FROM {RESULT_TABLES}
+                WHERE u.name = ?
+                ORDER BY r.timestamp DESC, r.id DESC
+                LIMIT ?
+            ''', (user_name, limit))
+        timestamp, row_id = before
+        return self._query(f'''
+            SELECT {RESULT_COLUMNS} FROM {RESULT_TABLES}
+            WHERE u.name = ? AND (r.timestamp < ? OR (r.timestamp = ? AND r.id < ?))
+            ORDER BY r.timestamp DESC, r.id DESC
+            LIMIT ?
+        ''', (user_name, timestamp, timestamp, row_id, limit))
+
+    def leaderboard(self, limit=10, round_number=None, offset=0):
+        # Highest net WPM rounds, optionally for a single round number
+        if round_number is None:
+            return self._query(f'''
+                SELECT {RESULT_COLUMNS} FROM {RESULT_TABLES}
+                ORDER BY r.net_wpm DESC, r.id DESC
+                LIMIT ? OFFSET ?
+            ''', (limit, offset))
+        return self._query(f'''
+            SELECT {RESULT_COLUMNS} FROM {RESULT_TABLES}
+            WHERE r.round_number = ?
+            ORDER BY r.net_wpm DESC, r.id DESC
+            LIMIT ? OFFSET ?
+        ''', (round_number, limit, offset))
+
+    def top_per_round(self, limit=10):
+        # {round_number: top rows}. Round numbers are found by skipping
+        # through the round index rather than scanning the table.
+        tops = {}
+        round_number = self._query(
+            'SELECT MIN(round_number) FROM typing_results'
+        )[0][0]
+        while round_number is not None:
+            tops[round_number] = self.leaderboard(limit, round_number)
+            round_number = self._query(
+                'SELECT MIN(round_number) FROM typing_results WHERE round_number > ?',
+                (round_number,)
+            )[0][0]
+        return tops
+
+    def _query(self, sql, params=()):
+        # Reads use their own connection on the calling thread; WAL lets them
+        # run alongside the writer without waiting for it. Fetched reads run
+        # on the worker, which already has one.
+        if threading.current_thread() is self._thread:
+            return self._worker_conn.execute(sql, params).fetchall()
+        if self._reader is None:
+            self._ready.wait()
+            self._reader = sqlite3.connect(self.db_name)
+        return self._reader.execute(sql, params).fetchall()
+
+    def _connect(self):
+        for db_name in self.db_names:
+            try:
+                conn = connect(db_name)
+                self.db_name = db_name  # Store the successful database name
+                print(f"Successfully connected to {db_name}")
+                return conn
+            except Exception as e:
+                print(f"Failed to connect to {db_name}: {e}")
+        return None
+
+    def _run(self):
+        conn = self._worker_conn = self._connect()
+        self._ready.set()
+        stopping = False
+        while not stopping:
+            batch = [self._queue.get()]
+            # Take whatever else is already waiting, up to one batch
+            while len(batch) < BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if _STOP in batch:
+                stopping = True
+                batch = [row for row in batch if row is not _STOP]
+                # Drain anything queued behind the stop marker as well
+                while True:
+                    try:
+                        row = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if row is not _STOP:
+                        batch.append(row)
+            flushes = [item for item in batch if isinstance(item, threading.Event)]
+            reads = [item for item in batch if isinstance(item, PendingRead)]
+            batch = [item for item in batch if isinstance(item, tuple)]
+            if batch:
+                self._write(conn, batch)
+            for done in flushes:
+                done.set()
+            for read in reads:
+                self._read(read)
+        if conn is not None:
+            conn.close()
+
+    def _read(self, read):
+        try:
+            read.result = read.method(*read.args, **read.kwargs)
+        except Exception as e:
+            print(f"Database error: {e}")
+        read.done.set()
+
+    def _write(self, conn, rows):
+        if conn is None:
+            print(f"Database error: no connection, dropped {len(rows)} result(s)")
+            return
+        try:
+            with conn:
+                key_rows = []
+                for row, keylog, key_stats in rows:
+                    insert_result(conn, row, keylog.to_blob() if keylog is not None else None)
+                    if key_stats is not None:
+                        key_rows.extend(key_stats.rows(user_id(conn, row[0])))
+                # One upsert batch for all the rounds in this transaction
+                if key_rows:
+                    upsert_key_stats(conn, key_rows)
+            print(f"Successfully saved {len(rows)} result(s) to {self.db_name}")
+        except Exception as e:
+            print(f"Database error: {e}")
+
+
+if __name__ == "__main__":
+    # python storage.py migrate [db ...]
+    if sys.argv[1:2] == ["migrate"]:
+        migrate_files(sys.argv[2:] or [name for name in DB_NAMES + LEGACY_DB_NAMES if os.path.exists(name)])
+    else:
+        print("usage: python storage.py migrate [db ...]")
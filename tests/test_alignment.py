@@ -0,0 +1,207 @@
+import random
+
+import pytest
+
+from alignment import Aligner
+from highlighting import CORRECT, INCORRECT, UNTYPED
+
+PASSAGE = "the cat sat"
+
+
+def type_keys(aligner, typed):
+    for i in range(1, len(typed) + 1):
+        aligner.update(typed[:i])
+    return aligner
+
+
+def paste(aligner, typed):
+    aligner.update(typed)
+    return aligner
+
+
+@pytest.mark.parametrize("enter", [type_keys, paste])
+@pytest.mark.parametrize("typed, correct_words, wrong", [
+    ("the cat sat", 3, []),
+    ("thxe cat sat", 2, [1]),  # Extra character inside a word
+    ("thex cat sat", 2, [2]),  # ... at the end of a word
+    ("the xcat sat", 2, [4]),  # ... at the start of a word
+    ("xthe cat sat", 2, [0]),  # ... before the passage
+    ("the cat satx", 2, [10]),  # ... after it
+    ("thecat sat", 1, [3]),  # Missing space fails the words on both sides
+    ("the cat sot", 2, [9]),
+])
+def test_word_errors(enter, typed, correct_words, wrong):
+    aligner = enter(Aligner(PASSAGE), typed)
+    assert aligner.correct_words == correct_words
+    assert [p for p, value in enumerate(aligner.status) if value == INCORRECT] == wrong
+    assert all(value == CORRECT for p, value in enumerate(aligner.status) if p not in wrong)
+
+
+def test_deleting_the_extra_character_clears_it():
+    aligner = type_keys(Aligner(PASSAGE), "thx")
+    aligner.update("th")
+    type_keys(aligner, "the cat sat")
+    assert aligner.correct_words == 3
+    assert aligner.distance == 0
+
+
+def prefix_distances(passage, typed):
+    # Reference O(mn) DP: edit distance between every passage prefix and
+    # the whole typed text
+    previous = list(range(len(passage) + 1))
+    for j, char in enumerate(typed, 1):
+        current = [j] + [0] * len(passage)
+        for i in range(1, len(passage) + 1):
+            current[i] = min(
+                previous[i] + 1,
+                current[i - 1] + 1,
+                previous[i - 1] + (passage[i - 1] != char),
+            )
+        previous = current
+    return previous
+
+
+def check(aligner):
+    status = aligner.status
+    row = aligner.row
+    assert aligner.distance == prefix_distances(aligner.text, aligner.typed)[row]
+    assert all(status[:row]), "passage left unmarked behind the caret"
+    assert not any(status[row:]), "passage marked past the caret"
+    incorrect = sum(1 for value in status if value == INCORRECT)
+    assert incorrect <= aligner.distance
+    assert (incorrect == 0) == (aligner.distance == 0) or row == 0
+    correct_words = 0
+    for start, end in zip(aligner._word_starts, aligner._word_ends):
+        correct_words += (all(status[p] == CORRECT for p in range(start, end))
+                          and (start == 0 or status[start - 1] != INCORRECT)
+                          and (end == aligner.m or status[end] != INCORRECT))
+    assert aligner.correct_words == correct_words
+
+
+def test_typed_then_pasted_past_a_skip():
+    passage = "brown dog then and jumps and the over run"
+    typed = "brow" + passage[5:passage.index("the over") + 8]
+    keyed = type_keys(Aligner(passage), typed)
+    pasted = paste(type_keys(Aligner(passage), typed[:4]), typed)
+    check(keyed)
+    check(pasted)
+    assert pasted.status == keyed.status
+    assert pasted.status[4] == INCORRECT
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_against_reference_distance(seed):
+    rng = random.Random(seed)
+    words = "the quick brown fox jumps over lazy dog".split()
+    passage = " ".join(rng.choice(words) for _ in range(50))
+    aligner = Aligner(passage)
+    typed = ""
+    for _ in range(300):
+        r = rng.random()
+        if r < 0.55:
+            if len(typed) < len(passage) and rng.random() < 0.9:
+                typed += passage[len(typed)]
+            else:
+                typed += rng.choice("xq ")
+        elif r < 0.6:
+            typed += passage[len(typed) + 1:len(typed) + 2]  # Skip one
+        elif r < 0.72:
+            typed = typed[:-1]
+        elif r < 0.74:
+            typed = typed[:rng.randrange(len(typed) + 1)]  # Delete a selection
+        elif r < 0.77:
+            # Paste ahead, sometimes skipping part of the passage
+            start = len(typed) + rng.choice([0, 0, 1, 3, 20])
+            typed += passage[start:start + rng.randint(30, 120)]
+        else:
+            typed += passage[len(typed):len(typed) + 1]
+        if len(typed) > len(passage):
+            typed = typed[:len(passage) // 2]
+        aligner.update(typed)
+        check(aligner)
+
+
+def reference_status(aligner):
+    # Statuses from a full O(mn) DP traced back from the aligner's row, with
+    # the aligner's rules: extra characters mark the character they follow
+    # (the one they precede at a word start) and incorrect marks win
+    passage, typed, row = aligner.text, aligner.typed, aligner.row
+    n = len(typed)
+    table = [list(range(n + 1))]
+    for i in range(1, row + 1):
+        above = table[-1]
+        current = [i] + [0] * n
+        for j in range(1, n + 1):
+            current[j] = min(
+                above[j] + 1,
+                current[j - 1] + 1,
+                above[j - 1] + (passage[i - 1] != typed[j - 1]),
+            )
+        table.append(current)
+
+    spans = list(zip(aligner._word_starts, aligner._word_ends))
+
+    def insertion_mark(gap):
+        position = gap - 1
+        word = next((span for span in spans if span[1] >= gap), None)
+        if word is not None and word[0] <= gap:
+            position = max(word[0], gap - 1)
+            if position >= row:
+                position = gap - 1
+        elif position < 0:
+            position = 0
+        return None if position >= row or position < 0 else position
+
+    correct, incorrect = set(), set()
+    i, j = row, n
+    while i > 0 and j > 0:
+        d = table[i][j]
+        diagonal = table[i - 1][j - 1]
+        if (passage[i - 1] == typed[j - 1] and diagonal == d) or diagonal == d - 1:
+            (correct if passage[i - 1] == typed[j - 1] else incorrect).add(i - 1)
+            i -= 1
+            j -= 1
+        elif table[i - 1][j] == d - 1:
+            incorrect.add(i - 1)
+            i -= 1
+        else:
+            incorrect.add(insertion_mark(i))
+            j -= 1
+    incorrect.update(range(i))
+    if j > 0:
+        incorrect.add(insertion_mark(0))
+    return bytearray(
+        INCORRECT if p in incorrect else CORRECT if p in correct else UNTYPED
+        for p in range(aligner.m)
+    )
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_mid_text_edits_against_full_trace(seed):
+    # Inserts, deletes and pastes anywhere in the typed text; after every
+    # one the marks must be what a full trace-back gives. The passage is
+    # longer than the aligner's band so the band moves.
+    rng = random.Random(seed)
+    words = "the quick brown fox jumps over lazy dog".split()
+    passage = " ".join(rng.choice(words) for _ in range(60))
+    aligner = Aligner(passage)
+    typed = ""
+    for _ in range(120):
+        r = rng.random()
+        position = rng.randrange(len(typed) + 1)
+        if r < 0.5 or not typed:
+            typed += passage[len(typed):len(typed) + 1] if rng.random() < 0.9 else rng.choice("xq ")
+        elif r < 0.6:
+            typed = typed[:-1]
+        elif r < 0.75:
+            typed = typed[:position] + rng.choice("xq e") * rng.randint(1, 3) + typed[position:]
+        elif r < 0.9:
+            typed = typed[:position] + typed[position + rng.randint(1, 3):]
+        else:
+            # Paste over a selection, roughly where it belongs
+            start = max(0, position + rng.randint(-3, 3))
+            typed = typed[:position] + passage[start:start + rng.randint(1, 40)] + typed[position + rng.randint(0, 10):]
+        typed = typed[:160]
+        aligner.update(typed)
+        check(aligner)
+        assert aligner.status == reference_status(aligner)
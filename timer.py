@@ -0,0 +1,84 @@
+import math
+import time
+
+
+class CountdownTimer:
+    # Round countdown driven by the Tk event loop.
+    # Time is measured against a time.monotonic() deadline, so late or
+    # skipped ticks never accumulate drift; each tick reschedules itself with
+    # root.after for the next display boundary. Everything runs on the Tk
+    # thread, and cancel() guarantees no tick of this round fires afterwards.
+    # With no duration it counts up instead, never expires, and on_tick is
+    # given the elapsed time.
+
+    def __init__(self, root, duration, on_tick, on_expire, resolution=0.1):
+        self.root = root
+        self.duration = duration
+        self.on_tick = on_tick
+        self.on_expire = on_expire
+        self.resolution = resolution
+        self._start = None
+        self._stop = None
+        self._job = None
+
+    @property
+    def running(self):
+        return self._job is not None
+
+    def start(self):
+        self.cancel()
+        self._start = time.monotonic()
+        self._stop = None
+        self._tick()
+
+    def cancel(self):
+        # Stop ticking and freeze elapsed() at the current instant
+        if self._job is not None:
+            self.root.after_cancel(self._job)
+            self._job = None
+        if self._start is not None and self._stop is None:
+            self._stop = time.monotonic()
+
+    def reset(self):
+        self.cancel()
+        self._start = None
+        self._stop = None
+
+    def elapsed(self):
+        if self._start is None:
+            return 0.0
+        end = self._stop if self._stop is not None else time.monotonic()
+        if self.duration is None:
+            return end - self._start
+        return min(end - self._start, self.duration)
+
+    def remaining(self):
+        if self.duration is None:
+            return math.inf
+        return max(self.duration - self.elapsed(), 0.0)
+
+    def _tick(self):
+        self._job = None
+        if self.duration is None:
+            elapsed = self.elapsed()
+            self.on_tick(elapsed)
+            delay = self.resolution - elapsed % self.resolution
+            self._job = self.root.after(max(1, math.ceil(delay * 1000)), self._tick)
+            return
+        remaining = self.remaining()
+        self.on_tick(remaining)
+        if remaining <= 0:
+            self._stop = self._start + self.duration
+            self.on_expire()
+            return
+
+        # Sleep until the remaining time crosses the next display boundary
+        delay = remaining % self.resolution or self.resolution
+        self._job = self.root.after(max(1, math.ceil(delay * 1000)), self._tick)
+
+
+def format_time(seconds):
+    # 59.94 -> "00:59.9"; rounds up so the display never reads 0 early
+    tenths = math.ceil(seconds * 10 - 1e-9)
+    mins, tenths = divmod(tenths, 600)
+    return f"{mins:02d}:{tenths // 10:02d}.{tenths % 10}"
@@ -0,0 +1,248 @@
+import argparse
+import csv
+import math
+import os
+import sqlite3
+import struct
+import sys
+import time
+import zlib
+from array import array
+
+from storage import DB_NAMES, RESULT_COLUMNS, RESULT_TABLES, create_schema, result_values
+
+# Bulk export and import of typing_results.
+#
+#   python transfer.py export results.csv
+#   python transfer.py export results.ttcol --format columnar
+#   python transfer.py import results.ttcol --db merged.db
+#
+# Rows are streamed through the SQLite cursor in fixed-size chunks in both
+# directions, so memory use does not depend on the table size. Imports run
+# as one transaction of executemany batches.
+#
+# The columnar format is a magic line followed by zlib-compressed chunks;
+# each chunk stores its rows column by column as packed arrays, with
+# user names as a length array plus one UTF-8 blob. Both formats carry the
+# rows as the app sees them (user name, percentages), not the normalized
+# table layout, so exports from any schema version can be imported.
+
+COLUMNS = ['id', 'user_name', 'round_number', 'gross_wpm', 'net_wpm', 'accuracy', 'error_rate', 'timestamp']
+NUMERIC_TYPES = ['q', None, 'q', 'd', 'd', 'd', 'd', 'd']
+
+MAGIC = b"TTCOL01\n"
+_CHUNK = struct.Struct("<II")  # rows, compressed size
+_NULL_LENGTH = 0xFFFFFFFF
+_NULL_INT = -(2 ** 63)
+
+CHUNK_ROWS = 10000
+
+
+def export_rows(conn, chunk_rows=CHUNK_ROWS):
+    # Yields lists of at most chunk_rows rows, in id order
+    cursor = conn.execute(f"SELECT {RESULT_COLUMNS} FROM {RESULT_TABLES} ORDER BY r.id")
+    while True:
+        rows = cursor.fetchmany(chunk_rows)
+        if not rows:
+            break
+        yield rows
+
+
+def write_csv(chunks, f):
+    writer = csv.writer(f)
+    writer.writerow(COLUMNS)
+    count = 0
+    for rows in chunks:
+        writer.writerows(rows)
+        count += len(rows)
+    return count
+
+
+def read_csv(f, chunk_rows=CHUNK_ROWS):
+    reader = csv.reader(f)
+    header = next(reader)
+    if header != COLUMNS:
+        raise ValueError(f"Unexpected CSV columns: {header}")
+    converters = [_int_or_none, _str_or_none, _int_or_none] + [_float_or_none] * 5
+    rows = []
+    for record in reader:
+        rows.append(tuple(convert(value) for convert, value in zip(converters, record)))
+        if len(rows) == chunk_rows:
+            yield rows
+            rows = []
+    if rows:
+        yield rows
+
+
+def _int_or_none(value):
+    return int(value) if value != "" else None
+
+
+def _float_or_none(value):
+    return float(value) if value != "" else None
+
+
+def _str_or_none(value):
+    return value if value != "" else None
+
+
+def write_columnar(chunks, f):
+    f.write(MAGIC)
+    count = 0
+    for rows in chunks:
+        payload = _pack_chunk(rows)
+        f.write(_CHUNK.pack(len(rows), len(payload)))
+        f.write(payload)
+        count += len(rows)
+    return count
+
+
+def read_columnar(f):
+    if f.read(len(MAGIC)) != MAGIC:
+        raise ValueError("Not a columnar typing_results export")
+    while True:
+        header = f.read(_CHUNK.size)
+        if not header:
+            break
+        count, size = _CHUNK.unpack(header)
+        yield _unpack_chunk(zlib.decompress(f.read(size)), count)
+
+
+def _pack_chunk(rows):
+    parts = []
+    for column, typecode in enumerate(NUMERIC_TYPES):
+        if typecode is None:
+            names = [row[column] for row in rows]
+            encoded = [name.encode("utf-8") if name is not None else b"" for name in names]
+            lengths = array('I', (
+                len(data) if name is not None else _NULL_LENGTH for name, data in zip(names, encoded)
+            ))
+            parts.append(_le_bytes(lengths))
+            parts.append(b"".join(encoded))
+        elif typecode == 'q':
+            parts.append(_le_bytes(array('q', (
+                row[column] if row[column] is not None else _NULL_INT for row in rows
+            ))))
+        else:
+            parts.append(_le_bytes(array('d', (
+                row[column] if row[column] is not None else math.nan for row in rows
+            ))))
+    return zlib.compress(b"".join(parts), 1)
+
+
+def _unpack_chunk(payload, count):
+    columns = []
+    pos = 0
+    for typecode in NUMERIC_TYPES:
+        if typecode is None:
+            lengths, pos = _le_array('I', payload, pos, count)
+            names = []
+            for length in lengths:
+                if length == _NULL_LENGTH:
+                    names.append(None)
+                else:
+                    names.append(payload[pos:pos + length].decode("utf-8"))
+                    pos += length
+            columns.append(names)
+        elif typecode == 'q':
+            values, pos = _le_array('q', payload, pos, count)
+            columns.append([None if v == _NULL_INT else v for v in values])
+        else:
+            values, pos = _le_array('d', payload, pos, count)
+            columns.append([None if math.isnan(v) else v for v in values])
+    return list(zip(*columns))
+
+
+def _le_bytes(values):
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values.tobytes()
+
+
+def _le_array(typecode, payload, pos, count):
+    values = array(typecode)
+    end = pos + values.itemsize * count
+    values.frombytes(payload[pos:end])
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values, end
+
+
+def import_rows(conn, chunks, keep_ids=False):
+    # One transaction for the whole import; ids are reassigned unless kept.
+    # New user names are added in one batch per chunk, then the rows are
+    # inserted with their users' ids.
+    columns = ['user_id', 'round_number', 'gross_wpm', 'net_wpm', 'accuracy_bp', 'error_rate_bp', 'timestamp']
+    if keep_ids:
+        columns.insert(0, 'id')
+    sql = f"INSERT INTO typing_results ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+    user_ids = {}
+    count = 0
+    with conn:
+        for rows in chunks:
+            names = {row[1] or "" for row in rows} - user_ids.keys()
+            if names:
+                conn.executemany('INSERT OR IGNORE INTO users (name) VALUES (?)', ((name,) for name in names))
+                for name in names:
+                    user_ids[name] = conn.execute('SELECT id FROM users WHERE name = ?', (name,)).fetchone()[0]
+            values = []
+            for row in rows:
+                value = result_values(user_ids[row[1] or ""], row[1:])
+                values.append((row[0],) + value if keep_ids else value)
+            conn.executemany(sql, values)
+            count += len(rows)
+    return count
+
+
+def _report(action, count, elapsed, path):
+    size = os.path.getsize(path)
+    rate = count / elapsed if elapsed > 0 else 0
+    print(
+        f"{action} {count} rows in {elapsed:.2f}s "
+        f"({rate:,.0f} rows/s, {size / 1024 / 1024:.1f} MiB, {size / max(count, 1):.1f} bytes/row)",
+        file=sys.stderr
+    )
+
+
+def _detect_format(path):
+    with open(path, "rb") as f:
+        return "columnar" if f.read(len(MAGIC)) == MAGIC else "csv"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk export and import of typing_results")
+    parser.add_argument("command", choices=["export", "import"])
+    parser.add_argument("path")
+    parser.add_argument("--db", default=DB_NAMES[0])
+    parser.add_argument("--format", choices=["csv", "columnar"],
+                        help="export format (default: from the file extension); detected on import")
+    parser.add_argument("--chunk", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--keep-ids", action="store_true", help="import rows with their original ids")
+    args = parser.parse_args(argv)
+
+    conn = sqlite3.connect(args.db)
+    create_schema(conn)  # Older files are migrated first
+    start = time.perf_counter()
+    if args.command == "export":
+        fmt = args.format or ("csv" if args.path.endswith(".csv") else "columnar")
+        chunks = export_rows(conn, args.chunk)
+        if fmt == "csv":
+            with open(args.path, "w", newline="", encoding="utf-8") as f:
+                count = write_csv(chunks, f)
+        else:
+            with open(args.path, "wb") as f:
+                count = write_columnar(chunks, f)
+        _report("Exported", count, time.perf_counter() - start, args.path)
+    else:
+        if _detect_format(args.path) == "columnar":
+            with open(args.path, "rb") as f:
+                count = import_rows(conn, read_columnar(f), args.keep_ids)
+        else:
+            with open(args.path, newline="", encoding="utf-8") as f:
+                count = import_rows(conn, read_csv(f, args.chunk), args.keep_ids)
+        _report("Imported", count, time.perf_counter() - start, args.path)
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
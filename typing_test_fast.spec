@@ -0,0 +1,91 @@
+# -*- mode: python ; coding: utf-8 -*-
+#
+# Build profile tuned for launch time:
+#
+#   pyinstaller typing_test_fast.spec
+#
+# - onedir, so nothing is unpacked to a temp directory on every launch
+#   (typing_test.spec builds a single self-extracting file)
+# - bytecode compiled with -OO (optimize=2)
+# - stdlib, pygame and PIL modules the app never imports are left out,
+#   which keeps the PYZ archive and its table of contents small
+# - UPX for the small binaries only; the big native libraries are loaded on
+#   every launch and decompressing them costs more than reading them
+#
+# Compare launch times of the builds with benchmarks/bench_startup.py.
+import os
+
+datas = [
+    ('typing.ico', '.'),
+    ('logo.svg', '.'),
+]
+if os.path.exists('passages.corpus'):
+    datas.append(('passages.corpus', '.'))
+
+excludes = [
+    # Stdlib the app does not use
+    'unittest', 'doctest', 'pydoc', 'pydoc_data', 'pdb', 'lib2to3', 'distutils',
+    'setuptools', 'pkg_resources', 'pip', 'test', 'idlelib', 'turtle', 'turtledemo',
+    'tkinter.test', 'tkinter.tix', 'xmlrpc', 'curses', 'dbm', 'sqlite3.test',
+    # pygame is only used for the mixer
+    'pygame.examples', 'pygame.tests', 'pygame.docs', 'pygame.camera', 'pygame._camera_opencv',
+    'pygame._camera_vidcapture', 'pygame.midi', 'pygame.sndarray', 'pygame.surfarray',
+    'pygame.freetype', 'pygame.ftfont', 'numpy',
+    # cairosvg needs PIL.Image, nothing that shows or grabs images
+    'PIL.ImageQt', 'PIL.ImageTk', 'PIL.ImageShow', 'PIL.ImageGrab', 'PIL.ImageWin',
+]
+
+# Large native libraries kept uncompressed
+upx_exclude = [
+    'python3.dll', 'python311.dll', 'python312.dll', 'libpython3.11.so.1.0', 'libpython3.12.so.1.0',
+    'tcl86t.dll', 'tk86t.dll', 'libtcl8.6.so', 'libtk8.6.so', '_tkinter.pyd',
+    'libcrypto-3.dll', 'libcrypto-3-x64.dll', 'libssl-3.dll', 'libssl-3-x64.dll',
+    'sqlite3.dll', '_sqlite3.pyd',
+    'SDL2.dll', 'SDL2_mixer.dll', 'libSDL2-2.0.so.0', 'libSDL2_mixer-2.0.so.0',
+    'libcairo-2.dll', 'libcairo.so.2',
+    'vcruntime140.dll', 'vcruntime140_1.dll', 'ucrtbase.dll',
+]
+
+a = Analysis(
+    ['app.py'],
+    pathex=[],
+    binaries=[],
+    datas=datas,
+    hiddenimports=[],
+    hookspath=[],
+    hooksconfig={},
+    runtime_hooks=[],
+    excludes=excludes,
+    noarchive=False,
+    optimize=2,
+)
+pyz = PYZ(a.pure)
+
+exe = EXE(
+    pyz,
+    a.scripts,
+    [],
+    exclude_binaries=True,
+    name='typing_test_fast',
+    debug=False,
+    bootloader_ignore_signals=False,
+    strip=False,
+    upx=True,
+    upx_exclude=upx_exclude,
+    console=False,
+    disable_windowed_traceback=False,
+    argv_emulation=False,
+    target_arch=None,
+    codesign_identity=None,
+    entitlements_file=None,
+    icon='typing.ico',
+)
+coll = COLLECT(
+    exe,
+    a.binaries,
+    a.datas,
+    strip=False,
+    upx=True,
+    upx_exclude=upx_exclude,
+    name='typing_test_fast',
+)